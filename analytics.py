@@ -0,0 +1,165 @@
+import sqlite3
+import threading
+
+import pandas as pd
+
+SNAPSHOT_COLUMNS = ('id', 'entry_date', 'exit_date', 'device_type',
+                    'material_cost', 'service_cost', 'total_cost')
+COST_COLUMNS = ('material_cost', 'service_cost', 'total_cost')
+GROUP_COLUMNS = ('device_type', 'entry_month', 'exit_month', 'is_closed')
+AGGREGATIONS = ('sum', 'mean', 'count', 'min', 'max')
+
+
+class AnalyticsSnapshot:
+    """نسخه ستونی جدول customers در حافظه برای گزارش‌های سریع
+
+    با تغییر شمارنده data_version به‌روز می‌شود؛ اگر فقط ردیف جدید اضافه شده
+    باشد همان ردیف‌ها خوانده و اضافه می‌شوند، وگرنه کل جدول دوباره بارگذاری
+    می‌شود.
+    """
+
+    def __init__(self, db_path, normalize_date):
+        self.db_path = db_path
+        self.normalize_date = normalize_date
+        self._frame = None
+        self._max_id = 0
+        self._changes = None
+        self._lock = threading.Lock()
+
+    def _read_version(self, cursor):
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM customers')
+        max_id = cursor.fetchone()[0]
+        cursor.execute('SELECT changes FROM data_version WHERE id = 1')
+        row = cursor.fetchone()
+        return max_id, row[0] if row else 0
+
+    def _load(self, cursor, after_id=0):
+        cursor.execute(
+            f'SELECT {", ".join(SNAPSHOT_COLUMNS)} FROM customers WHERE id > ? ORDER BY id',
+            (after_id,)
+        )
+        frame = pd.DataFrame.from_records(cursor.fetchall(), columns=SNAPSHOT_COLUMNS)
+        for column in COST_COLUMNS:
+            frame[column] = pd.to_numeric(frame[column], errors='coerce').fillna(0).astype('int64')
+
+        # تاریخ‌ها یک بار نرمال می‌شوند تا فیلترها مقایسه رشته‌ای ساده باشند
+        frame['entry_date'] = frame['entry_date'].map(self._normalize)
+        frame['exit_date'] = frame['exit_date'].map(self._normalize)
+        frame['entry_month'] = frame['entry_date'].str[:7]
+        frame['exit_month'] = frame['exit_date'].str[:7]
+        frame['is_closed'] = frame['exit_date'].notna()
+        return frame
+
+    def _normalize(self, value):
+        return self.normalize_date(str(value)) if value else None
+
+    def _parse_filter_date(self, value):
+        """نرمال کردن تاریخ فیلتر؛ تاریخ نامعتبر به جای نتیجه خالی خطا می‌دهد"""
+        if not value:
+            return None
+        normalized = self._normalize(value)
+        if not normalized:
+            raise ValueError(f'تاریخ نامعتبر: {value}')
+        return normalized
+
+    def refresh(self):
+        """به‌روزرسانی snapshot در صورت تغییر داده‌ها"""
+        with self._lock:
+            conn = sqlite3.connect(self.db_path, isolation_level=None)
+            try:
+                cursor = conn.cursor()
+                # نسخه و ردیف‌ها از یک snapshot خوانده می‌شوند؛ وگرنه نوشتنی که
+                # بین دو کوئری برسد دو بار به snapshot اضافه می‌شود
+                cursor.execute('BEGIN')
+                max_id, changes = self._read_version(cursor)
+                if self._frame is not None and changes == self._changes:
+                    return self._frame
+
+                appended = None
+                if self._frame is not None and max_id > self._max_id:
+                    cursor.execute('SELECT COUNT(*) FROM customers WHERE id > ?', (self._max_id,))
+                    appended = cursor.fetchone()[0]
+
+                if appended is not None and changes - self._changes == appended:
+                    # فقط INSERT انجام شده است
+                    frame = pd.concat([self._frame, self._load(cursor, self._max_id)], ignore_index=True)
+                else:
+                    frame = self._load(cursor)
+                cursor.execute('COMMIT')
+            finally:
+                conn.close()
+
+            frame['device_type'] = frame['device_type'].fillna('').astype(str).astype('category')
+            self._frame = frame
+            self._max_id = max_id
+            self._changes = changes
+            return frame
+
+    def query(self, group_by=None, metrics=('total_cost',), agg='sum',
+              start_date=None, end_date=None, device_type=None, closed_only=False):
+        """فیلتر، گروه‌بندی و تجمیع روی snapshot
+
+        start_date و end_date روی تاریخ خروج اعمال می‌شوند (مثل گزارش درآمد).
+        خروجی لیستی از دیکشنری‌هاست؛ بدون group_by فقط یک ردیف برمی‌گردد.
+        """
+        group_by = [group_by] if isinstance(group_by, str) else list(group_by or [])
+        metrics = [metrics] if isinstance(metrics, str) else list(metrics)
+        invalid = [column for column in group_by if column not in GROUP_COLUMNS]
+        invalid += [column for column in metrics if column not in COST_COLUMNS]
+        if invalid or agg not in AGGREGATIONS:
+            raise ValueError(f'پارامتر نامعتبر: {", ".join(invalid) or agg}')
+
+        start = self._parse_filter_date(start_date)
+        end = self._parse_filter_date(end_date)
+
+        frame = self.refresh()
+        mask = pd.Series(True, index=frame.index)
+        if start or end or closed_only:
+            mask &= frame['is_closed']
+        if start:
+            mask &= frame['exit_date'] >= start
+        if end:
+            mask &= frame['exit_date'] <= end
+        if device_type:
+            mask &= frame['device_type'] == device_type
+        selected = frame.loc[mask, metrics + group_by]
+
+        if not group_by:
+            row = {'count': int(len(selected))}
+            for column in metrics:
+                value = getattr(selected[column], agg)() if len(selected) else 0
+                row[column] = _to_python(value)
+            return [row]
+
+        grouped = selected.groupby(group_by, observed=True, sort=True)
+        result = grouped[metrics].agg(agg)
+        result['count'] = grouped.size()
+        return [
+            {key: _to_python(value) for key, value in row.items()}
+            for row in result.reset_index().to_dict('records')
+        ]
+
+    def revenue_by(self, dimension, **filters):
+        """درآمد به تفکیک نوع وسیله یا ماه"""
+        dimensions = {'device_type': 'device_type', 'month': 'exit_month',
+                      'entry_month': 'entry_month'}
+        if dimension not in dimensions:
+            raise ValueError(f'پارامتر نامعتبر: {dimension}')
+        return self.query(group_by=dimensions[dimension], metrics=COST_COLUMNS, **filters)
+
+    def cost_split(self, **filters):
+        """سهم قیمت جنس و دستمزد از کل درآمد"""
+        row = self.query(metrics=COST_COLUMNS, **filters)[0]
+        total = row['total_cost'] or 0
+        row['material_share'] = round(row['material_cost'] / total, 4) if total else 0
+        row['service_share'] = round(row['service_cost'] / total, 4) if total else 0
+        return row
+
+
+def _to_python(value):
+    """تبدیل مقادیر NumPy به انواع قابل JSON"""
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float):
+        return round(value, 2)
+    return value
@@ -3,11 +3,27 @@ import sqlite3
 import pandas as pd
 import os
 import sys
+import shutil
+import tempfile
+import multiprocessing
 from datetime import datetime
 from werkzeug.utils import secure_filename
+from write_queue import WriteQueue
+from export_cache import ExportCache, cleanup_folder
+from customer_summary import init_customer_summary, summary_to_dict, SUMMARY_COLUMNS
+from check_database import MaintenanceScheduler, run_maintenance, collect_diagnostics
+from backup import BackupManager, list_backups
+from queries import fetch_stats, fetch_recent_customers, fetch_customer, search_customer_rows
+from analytics import AnalyticsSnapshot
+from import_pipeline import run_import, expand_archives
+from render_cache import PageCache, cached_page_response
 
 app = Flask(__name__)
 
+# حذف فاصله‌های اضافه تگ‌های بلاکی Jinja برای HTML فشرده‌تر
+app.jinja_env.trim_blocks = True
+app.jinja_env.lstrip_blocks = True
+
 # مسیرهای پروژه - استفاده از مسیر مطلق
 if getattr(sys, 'frozen', False):
     # اگر برنامه executable شده باشد
@@ -20,6 +36,20 @@ app.config['UPLOAD_FOLDER'] = os.path.join(BASE_DIR, 'uploads')
 app.config['EXPORT_FOLDER'] = os.path.join(BASE_DIR, 'exports')
 app.config['DATA_FOLDER'] = os.path.join(BASE_DIR, 'data')
 app.config['DATABASE_PATH'] = os.path.join(app.config['DATA_FOLDER'], 'repair_shop.db')
+app.config['BACKUP_FOLDER'] = os.path.join(BASE_DIR, 'backups')
+
+# سیاست پاک‌سازی پوشه‌های خروجی و آپلود (ثانیه / بایت)
+app.config['EXPORT_MAX_AGE'] = 7 * 24 * 3600
+app.config['EXPORT_MAX_SIZE'] = 200 * 1024 * 1024
+app.config['UPLOAD_MAX_AGE'] = 24 * 3600
+app.config['UPLOAD_MAX_SIZE'] = 200 * 1024 * 1024
+
+# فاصله اجرای نگهداری خودکار دیتابیس (ثانیه)؛ صفر یعنی غیرفعال
+app.config['MAINTENANCE_INTERVAL'] = 24 * 3600
+
+# پشتیبان‌گیری خودکار (ثانیه) و تعداد نسخه‌های نگه‌داشته‌شده
+app.config['BACKUP_INTERVAL'] = 6 * 3600
+app.config['BACKUP_KEEP'] = 28
 
 print(f"📁 مسیر پایه: {BASE_DIR}")
 print(f"📊 مسیر دیتابیس: {app.config['DATABASE_PATH']}")
@@ -28,8 +58,44 @@ print(f"📊 مسیر دیتابیس: {app.config['DATABASE_PATH']}")
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['EXPORT_FOLDER'], exist_ok=True)
 os.makedirs(app.config['DATA_FOLDER'], exist_ok=True)
+os.makedirs(app.config['BACKUP_FOLDER'], exist_ok=True)
+
+ALLOWED_EXTENSIONS = {'xlsx', 'xls', 'zip'}
+
+# حداکثر تعداد ردیف در هر صفحه از لیست مشتریان
+MAX_PER_PAGE = 500
+
+# تعداد پروسس‌های پارس اکسل در ایمپورت (None یعنی تعداد هسته‌ها)
+app.config['IMPORT_WORKERS'] = None
+
+# حداکثر تعداد عملیات در یک درخواست گروهی
+MAX_BATCH_OPERATIONS = 1000
+
+# فیلدهای قابل ویرایش در عملیات گروهی
+BATCH_TEXT_FIELDS = ('full_name', 'phone_number', 'entry_date', 'exit_date',
+                     'device_code', 'device_type', 'description')
+BATCH_REQUIRED_FIELDS = ('full_name', 'phone_number', 'entry_date', 'device_code', 'device_type')
+BATCH_COST_FIELDS = ('material_cost', 'service_cost')
 
-ALLOWED_EXTENSIONS = {'xlsx', 'xls'}
+# همه نوشتن‌ها از یک رشته و با کامیت گروهی انجام می‌شوند
+write_queue = WriteQueue(app.config['DATABASE_PATH'])
+
+# فایل‌های اکسپورت تا وقتی داده تغییر نکرده دوباره ساخته نمی‌شوند
+export_cache = ExportCache(app.config['EXPORT_FOLDER'])
+
+# صفحات رندر شده لیست مشتریان بر اساس نسخه داده
+page_cache = PageCache()
+
+maintenance_scheduler = MaintenanceScheduler(
+    app.config['DATABASE_PATH'], app.config['MAINTENANCE_INTERVAL']
+)
+
+backup_manager = BackupManager(
+    app.config['DATABASE_PATH'],
+    app.config['BACKUP_FOLDER'],
+    interval=app.config['BACKUP_INTERVAL'],
+    keep=app.config['BACKUP_KEEP']
+)
 
 def init_db():
     """ایجاد دیتابیس و جدول‌ها"""
@@ -57,7 +123,31 @@ def init_db():
             )
         ''')
         
+        # شمارنده تغییرات برای تشخیص نسخه داده
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS data_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                changes INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute('INSERT OR IGNORE INTO data_version (id, changes) VALUES (1, 0)')
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS customers_version_{event.lower()}
+                AFTER {event} ON customers
+                BEGIN
+                    UPDATE data_version SET changes = changes + 1 WHERE id = 1;
+                END
+            ''')
+        
+        # خلاصه سوابق هر شماره تماس
+        init_customer_summary(cursor)
+        
         conn.commit()
+        
+        # حالت WAL تا خواندن‌ها منتظر نویسنده نمانند
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.fetchone()
         conn.close()
         
         if db_exists:
@@ -92,6 +182,17 @@ def show_db_info():
     except Exception as e:
         print(f"⚠️ خطا در دریافت اطلاعات دیتابیس: {e}")
 
+def get_data_version():
+    """نسخه فعلی داده‌ها: بزرگ‌ترین شناسه به همراه شمارنده تغییرات"""
+    conn = sqlite3.connect(app.config['DATABASE_PATH'])
+    cursor = conn.cursor()
+    cursor.execute('SELECT COALESCE(MAX(id), 0) FROM customers')
+    max_id = cursor.fetchone()[0]
+    cursor.execute('SELECT changes FROM data_version WHERE id = 1')
+    row = cursor.fetchone()
+    conn.close()
+    return f"{max_id}-{row[0] if row else 0}"
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
@@ -123,22 +224,24 @@ def normalize_persian_date(date_str):
     
     return f"{year}/{month}/{day}"
 
-def add_customer(data):
-    """افزودن مشتری جدید به دیتابیس"""
-    conn = sqlite3.connect(app.config['DATABASE_PATH'])
-    cursor = conn.cursor()
-    
+# نسخه ستونی داده‌ها برای گزارش‌ها
+analytics_snapshot = AnalyticsSnapshot(app.config['DATABASE_PATH'], normalize_persian_date)
+
+INSERT_CUSTOMER_SQL = '''
+    INSERT INTO customers 
+    (full_name, phone_number, entry_date, exit_date, 
+     device_code, device_type, material_cost, service_cost, total_cost, description)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+def customer_insert_params(data):
+    """ساخت پارامترهای INSERT از داده‌های مشتری"""
     # تبدیل مقادیر به integer و مدیریت مقادیر خالی
     material_cost = safe_int(data.get('material_cost', 0))
     service_cost = safe_int(data.get('service_cost', 0))
     total_cost = material_cost + service_cost
     
-    cursor.execute('''
-        INSERT INTO customers 
-        (full_name, phone_number, entry_date, exit_date, 
-         device_code, device_type, material_cost, service_cost, total_cost, description)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
+    return (
         data['full_name'], 
         data['phone_number'],
         data['entry_date'], 
@@ -149,68 +252,47 @@ def add_customer(data):
         service_cost,
         total_cost, 
         data.get('description', '')
-    ))
-    
-    conn.commit()
-    customer_id = cursor.lastrowid
-    conn.close()
+    )
+
+def add_customer(data):
+    """افزودن مشتری جدید به دیتابیس"""
+    params = customer_insert_params(data)
+    customer_id, _ = write_queue.execute(INSERT_CUSTOMER_SQL, params)
     
     print(f"➕ مشتری جدید ثبت شد: {data['full_name']} (ID: {customer_id})")
     return customer_id
 
-def get_all_customers():
-    """دریافت همه مشتریان"""
+def get_all_customers(limit=None, offset=0):
+    """دریافت همه مشتریان (یا یک صفحه از آن‌ها)"""
     conn = sqlite3.connect(app.config['DATABASE_PATH'])
     cursor = conn.cursor()
-    cursor.execute('SELECT * FROM customers ORDER BY created_at DESC')
+    if limit is None:
+        cursor.execute('SELECT * FROM customers ORDER BY created_at DESC')
+    else:
+        cursor.execute('SELECT * FROM customers ORDER BY created_at DESC LIMIT ? OFFSET ?',
+                       (limit, offset))
     customers = cursor.fetchall()
     conn.close()
     return customers
 
-def search_customers(query):
+def search_customers(query, limit=None, offset=0):
     """جستجوی مشتریان"""
     conn = sqlite3.connect(app.config['DATABASE_PATH'])
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT * FROM customers 
-        WHERE full_name LIKE ? OR phone_number LIKE ? OR device_code LIKE ? OR device_type LIKE ?
-        ORDER BY created_at DESC
-    ''', (f'%{query}%', f'%{query}%', f'%{query}%', f'%{query}%'))
-    customers = cursor.fetchall()
+    customers = search_customer_rows(conn, query, limit, offset)
     conn.close()
     return customers
 
 def get_income_by_exit_date_range(start_date, end_date):
-    """محاسبه درآمد در بازه زمانی مشخص بر اساس تاریخ خروج"""
-    conn = sqlite3.connect(app.config['DATABASE_PATH'])
-    cursor = conn.cursor()
-    
+    """محاسبه درآمد و تعداد مشتریان در بازه زمانی مشخص بر اساس تاریخ خروج"""
     # نرمال کردن تاریخ‌های ورودی
     start_normalized = normalize_persian_date(start_date)
     end_normalized = normalize_persian_date(end_date)
     
     if not start_normalized or not end_normalized:
-        return 0
-    
-    # گرفتن همه مشتریان با تاریخ خروج
-    cursor.execute('''
-        SELECT id, exit_date, total_cost FROM customers 
-        WHERE exit_date IS NOT NULL AND exit_date != ''
-    ''')
-    all_customers = cursor.fetchall()
-    
-    # فیلتر کردن در پایتون با تاریخ نرمال شده
-    total_income = 0
+        return 0, 0
     
-    for customer in all_customers:
-        customer_exit_normalized = normalize_persian_date(customer[1])
-        if customer_exit_normalized:
-            # مقایسه تاریخ‌های نرمال شده
-            if start_normalized <= customer_exit_normalized <= end_normalized:
-                total_income += customer[2] or 0
-    
-    conn.close()
-    return total_income
+    result = analytics_snapshot.query(start_date=start_normalized, end_date=end_normalized)[0]
+    return result['total_cost'], result['count']
 
 def get_customers_by_exit_date_range(start_date, end_date):
     """دریافت مشتریان در بازه زمانی مشخص بر اساس تاریخ خروج"""
@@ -245,73 +327,204 @@ def get_customers_by_exit_date_range(start_date, end_date):
     conn.close()
     return matching_customers
 
-def import_from_excel(file_path):
-    """ایمپورت از فایل اکسل"""
+def import_from_excel(file_paths):
+    """ایمپورت از یک یا چند فایل اکسل یا zip، همه شیت‌ها
+
+    شیت‌ها به صورت موازی پارس می‌شوند و ردیف‌ها در یک دیتابیس موقت جمع
+    می‌شوند؛ اگر همه شیت‌ها سالم باشند، همه با هم در یک تراکنش رشته نویسنده
+    ثبت می‌شوند و در غیر این صورت هیچ ردیفی ثبت نمی‌شود.
+    """
+    if isinstance(file_paths, str):
+        file_paths = [file_paths]
+    
+    extract_dir = tempfile.mkdtemp(dir=app.config['UPLOAD_FOLDER'])
     try:
-        df = pd.read_excel(file_path)
-        imported_count = 0
+        workbooks = expand_archives(file_paths, extract_dir)
+        print(f"📥 شروع ایمپورت از {len(workbooks)} فایل اکسل")
         
-        print(f"📥 شروع ایمپورت از فایل: {file_path}")
-        print(f"📋 تعداد ردیف‌های پیدا شده: {len(df)}")
+        # همه ردیف‌ها در یک تراکنش روی رشته نویسنده
+        def commit(rows):
+            def _insert_rows(cursor):
+                cursor.executemany(INSERT_CUSTOMER_SQL, rows)
+                return cursor.rowcount
+            return write_queue.submit(_insert_rows, timeout=None)
         
-        for index, row in df.iterrows():
-            # تطبیق نام ستون‌ها با فایل اکسل شما
-            data = {
-                'full_name': str(row.get('نام مشتری', '')) or str(row.get('نام منشری', '')) or 'نامشخص',
-                'phone_number': str(row.get('شماره تماس', '')) or 'نامشخص',
-                'entry_date': str(row.get('تاریخ ورود', '')) or '1403/10/15',
-                'exit_date': str(row.get('تاریخ خروج', '')) or str(row.get('تاریخ حریح', '')) or '',
-                'device_code': str(row.get('کد وسیله', '')) or 'نامشخص',
-                'device_type': str(row.get('نوع وسیله', '')) or 'نامشخص',
-                'material_cost': safe_int(row.get('قیمت جنس', 0)),
-                'service_cost': safe_int(row.get('سود فروش و دستمزد', 0) or row.get('سود فروش و مستمره', 0)),
-                'description': str(row.get('توضیحات', '')) or ''
-            }
-            
-            add_customer(data)
-            imported_count += 1
-            
-            # نمایش پیشرفت
-            if (index + 1) % 10 == 0:
-                print(f"📊 در حال پردازش ردیف {index + 1} از {len(df)}")
+        result = run_import(
+            workbooks, customer_insert_params, commit, extract_dir,
+            workers=app.config['IMPORT_WORKERS']
+        )
         
-        print(f"✅ ایمپورت کامل شد: {imported_count} رکورد اضافه شد")
-        return imported_count
+        if not result['committed']:
+            failed = [sheet for sheet in result['sheets'] if sheet['error']]
+            details = '؛ '.join(
+                f"{sheet['file']}" + (f" / {sheet['sheet']}" if sheet['sheet'] else '') + f": {sheet['error']}"
+                for sheet in failed
+            )
+            raise Exception(f"{details} — هیچ رکوردی ثبت نشد")
+        
+        skipped = [sheet['sheet'] for sheet in result['sheets'] if sheet['skipped']]
+        print(f"✅ ایمپورت کامل شد: {result['imported']} رکورد از {len(result['sheets']) - len(skipped)} شیت اضافه شد")
+        if skipped:
+            print(f"⏭️ شیت‌های بدون ستون‌های مشتری رد شدند: {'، '.join(map(str, skipped))}")
+        return result
         
     except Exception as e:
         print(f"❌ خطا در ایمپورت فایل: {str(e)}")
         raise Exception(f"خطا در ایمپورت فایل: {str(e)}")
+    finally:
+        shutil.rmtree(extract_dir, ignore_errors=True)
 
-def export_to_excel():
-    """اکسپورت به فایل اکسل"""
-    customers = get_all_customers()
-    
-    # ساخت لیست داده‌ها برای DataFrame
-    data = []
-    for customer in customers:
-        data.append({
-            'ID': customer[0],
-            'نام مشتری': customer[1],
-            'شماره تماس': customer[2],
-            'تاریخ ورود': customer[3],
-            'تاریخ خروج': customer[4] or '',
-            'کد وسیله': customer[5],
-            'نوع وسیله': customer[6],
-            'قیمت جنس': customer[7] or 0,
-            'سود فروش و دستمزد': customer[8] or 0,
-            'مجموع': customer[9] or 0,
-            'توضیحات': customer[10] or '',
-            'تاریخ ثبت': customer[11]
-        })
+def export_to_excel(start_date=None, end_date=None):
+    """اکسپورت به فایل اکسل
+
+    خروجی (مسیر فایل، نام دانلود) است. اگر از آخرین اکسپورت همین محدوده
+    داده‌ای تغییر نکرده باشد، فایل کش شده برگردانده می‌شود.
+    """
+    if start_date and end_date:
+        scope = f"range:{normalize_persian_date(start_date)}:{normalize_persian_date(end_date)}"
+    else:
+        scope = 'all'
+    key = f"{get_data_version()}|{scope}"
     
-    df = pd.DataFrame(data)
+    def build(filepath):
+        if scope == 'all':
+            customers = get_all_customers()
+        else:
+            customers = get_customers_by_exit_date_range(start_date, end_date)
+        
+        # ساخت لیست داده‌ها برای DataFrame
+        data = []
+        for customer in customers:
+            data.append({
+                'ID': customer[0],
+                'نام مشتری': customer[1],
+                'شماره تماس': customer[2],
+                'تاریخ ورود': customer[3],
+                'تاریخ خروج': customer[4] or '',
+                'کد وسیله': customer[5],
+                'نوع وسیله': customer[6],
+                'قیمت جنس': customer[7] or 0,
+                'سود فروش و دستمزد': customer[8] or 0,
+                'مجموع': customer[9] or 0,
+                'توضیحات': customer[10] or '',
+                'تاریخ ثبت': customer[11]
+            })
+        
+        df = pd.DataFrame(data)
+        df.to_excel(filepath, index=False, engine='openpyxl')
     
+    filepath, cached = export_cache.get_or_create(key, build)
     filename = f"گزارش_تعمیرات_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
-    filepath = os.path.join(app.config['EXPORT_FOLDER'], filename)
-    df.to_excel(filepath, index=False, engine='openpyxl')
     
-    print(f"📤 گزارش اکسل ایجاد شد: {filename}")
-    return filename
+    if cached:
+        print(f"📤 گزارش اکسل از کش برگردانده شد: {filename}")
+    else:
+        print(f"📤 گزارش اکسل ایجاد شد: {filename}")
+        cleanup_folder(
+            app.config['EXPORT_FOLDER'],
+            max_age=app.config['EXPORT_MAX_AGE'],
+            max_total_size=app.config['EXPORT_MAX_SIZE'],
+            keep=[filepath]
+        )
+    return filepath, filename
+
+def validate_batch_operation(operation, seen_ids=None):
+    """بررسی یک عملیات گروهی؛ خروجی (عملیات نرمال شده، پیام خطا)
+
+    seen_ids شناسه‌های عملیات قبلی همان درخواست است؛ هر مشتری فقط یک بار
+    می‌تواند در یک درخواست بیاید تا ترتیب اجرا روی نتیجه اثر نگذارد.
+    """
+    if not isinstance(operation, dict):
+        return None, 'قالب عملیات نامعتبر است'
+    
+    action = operation.get('action')
+    if action not in ('update', 'delete'):
+        return None, 'نوع عملیات باید update یا delete باشد'
+    
+    try:
+        customer_id = int(operation.get('id'))
+    except (ValueError, TypeError):
+        return None, 'شناسه مشتری نامعتبر است'
+    
+    if seen_ids is not None:
+        if customer_id in seen_ids:
+            return None, 'این مشتری بیش از یک بار در درخواست آمده است'
+        seen_ids.add(customer_id)
+    
+    if action == 'delete':
+        return {'action': action, 'id': customer_id}, None
+    
+    fields = operation.get('fields')
+    if not isinstance(fields, dict) or not fields:
+        return None, 'فیلدی برای به‌روزرسانی ارسال نشده است'
+    
+    unknown = set(fields) - set(BATCH_TEXT_FIELDS) - set(BATCH_COST_FIELDS)
+    if unknown:
+        return None, f'فیلد نامعتبر: {", ".join(sorted(unknown))}'
+    
+    values = {}
+    for field in BATCH_TEXT_FIELDS:
+        if field in fields:
+            value = '' if fields[field] is None else str(fields[field]).strip()
+            if field in BATCH_REQUIRED_FIELDS and not value:
+                return None, f'فیلد {field} نمی‌تواند خالی باشد'
+            values[field] = value
+    for field in BATCH_COST_FIELDS:
+        if field in fields:
+            value = safe_int(fields[field], default=None)
+            if value is None or value < 0:
+                return None, f'مقدار {field} نامعتبر است'
+            values[field] = value
+    
+    return {'action': action, 'id': customer_id, 'fields': values}, None
+
+def apply_customer_batch(operations):
+    """اجرای همه عملیات در یک تراکنش؛ یا همه انجام می‌شوند یا هیچ‌کدام
+
+    خروجی لیست شناسه‌هایی است که پیدا نشدند؛ اگر خالی نباشد چیزی تغییر نکرده است.
+    """
+    columns = BATCH_TEXT_FIELDS + BATCH_COST_FIELDS
+    update_sql = f'''
+        UPDATE customers
+        SET {", ".join(f"{column} = COALESCE(?, {column})" for column in columns)},
+            total_cost = COALESCE(?, material_cost) + COALESCE(?, service_cost)
+        WHERE id = ?
+    '''
+    update_rows = []
+    delete_rows = []
+    for operation in operations:
+        if operation['action'] == 'update':
+            fields = operation['fields']
+            update_rows.append(
+                tuple(fields.get(column) for column in columns)
+                + (fields.get('material_cost'), fields.get('service_cost'), operation['id'])
+            )
+        else:
+            delete_rows.append((operation['id'],))
+    
+    ids = sorted({operation['id'] for operation in operations})
+    
+    def _apply(cursor):
+        # بررسی وجود همه مشتریان قبل از هر تغییری
+        found = set()
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            cursor.execute(
+                f'SELECT id FROM customers WHERE id IN ({", ".join("?" * len(chunk))})',
+                chunk
+            )
+            found.update(row[0] for row in cursor.fetchall())
+        missing = [customer_id for customer_id in ids if customer_id not in found]
+        if missing:
+            return missing
+        
+        if update_rows:
+            cursor.executemany(update_sql, update_rows)
+        if delete_rows:
+            cursor.executemany('DELETE FROM customers WHERE id = ?', delete_rows)
+        return []
+    
+    return write_queue.submit(_apply)
 
 # Routes
 @app.route('/')
@@ -338,10 +551,7 @@ def update_customer():
         # محاسبه مجموع جدید
         total_cost = data['material_cost'] + data['service_cost']
         
-        conn = sqlite3.connect(app.config['DATABASE_PATH'])
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+        write_queue.execute('''
             UPDATE customers 
             SET full_name = ?, phone_number = ?, entry_date = ?, exit_date = ?,
                 device_code = ?, device_type = ?, material_cost = ?, service_cost = ?,
@@ -354,9 +564,6 @@ def update_customer():
             data['description'], customer_id
         ))
         
-        conn.commit()
-        conn.close()
-        
         print(f"✏️ مشتری به‌روزرسانی شد: {data['full_name']} (ID: {customer_id})")
         
         return jsonify({
@@ -375,12 +582,17 @@ def update_customer():
 def delete_customer(customer_id):
     """حذف یک مشتری"""
     try:
-        conn = sqlite3.connect(app.config['DATABASE_PATH'])
-        cursor = conn.cursor()
+        def _delete(cursor):
+            # ابتدا اطلاعات مشتری رو بگیریم برای لاگ
+            cursor.execute('SELECT full_name FROM customers WHERE id = ?', (customer_id,))
+            customer = cursor.fetchone()
+            
+            # حذف مشتری
+            if customer:
+                cursor.execute('DELETE FROM customers WHERE id = ?', (customer_id,))
+            return customer
         
-        # ابتدا اطلاعات مشتری رو بگیریم برای لاگ
-        cursor.execute('SELECT full_name FROM customers WHERE id = ?', (customer_id,))
-        customer = cursor.fetchone()
+        customer = write_queue.submit(_delete)
         
         if not customer:
             return jsonify({
@@ -388,11 +600,6 @@ def delete_customer(customer_id):
                 'message': 'مشتری یافت نشد'
             })
         
-        # حذف مشتری
-        cursor.execute('DELETE FROM customers WHERE id = ?', (customer_id,))
-        conn.commit()
-        conn.close()
-        
         print(f"🗑️ مشتری حذف شد: {customer[0]} (ID: {customer_id})")
         
         return jsonify({
@@ -438,14 +645,96 @@ def add_customer_page():
     
     return render_template('add_customer.html')
 
+@app.route('/api/batch-customers', methods=['POST'])
+def batch_customers():
+    """به‌روزرسانی یا حذف گروهی مشتریان در یک تراکنش"""
+    try:
+        data = request.get_json(silent=True) or {}
+        operations = data.get('operations')
+        
+        if not isinstance(operations, list) or not operations:
+            return jsonify({
+                'success': False,
+                'message': 'لیست عملیات خالی است'
+            })
+        
+        if len(operations) > MAX_BATCH_OPERATIONS:
+            return jsonify({
+                'success': False,
+                'message': f'حداکثر {MAX_BATCH_OPERATIONS} عملیات در هر درخواست مجاز است'
+            })
+        
+        # بررسی همه عملیات قبل از اجرا
+        normalized = []
+        results = []
+        seen_ids = set()
+        for index, operation in enumerate(operations):
+            item, error = validate_batch_operation(operation, seen_ids)
+            normalized.append(item)
+            results.append({
+                'index': index,
+                'id': item['id'] if item else None,
+                'action': item['action'] if item else None,
+                'success': error is None,
+                'message': error or 'آماده اجرا'
+            })
+        
+        if any(not result['success'] for result in results):
+            return jsonify({
+                'success': False,
+                'message': 'برخی عملیات نامعتبر هستند؛ هیچ تغییری اعمال نشد',
+                'results': results
+            })
+        
+        missing = set(apply_customer_batch(normalized))
+        if missing:
+            for result in results:
+                if result['id'] in missing:
+                    result['success'] = False
+                    result['message'] = 'مشتری یافت نشد'
+            return jsonify({
+                'success': False,
+                'message': 'برخی مشتریان یافت نشدند؛ هیچ تغییری اعمال نشد',
+                'results': results
+            })
+        
+        for result in results:
+            result['message'] = 'حذف شد' if result['action'] == 'delete' else 'به‌روزرسانی شد'
+        
+        print(f"📦 عملیات گروهی انجام شد: {len(results)} عملیات")
+        
+        return jsonify({
+            'success': True,
+            'message': f'{len(results)} عملیات با موفقیت انجام شد',
+            'results': results
+        })
+        
+    except Exception as e:
+        print(f"❌ خطا در عملیات گروهی: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'خطا در عملیات گروهی: {str(e)}'
+        })
+
 @app.route('/customers')
 def customers_page():
     search_query = request.args.get('search', '')
-    if search_query:
-        customers = search_customers(search_query)
-    else:
-        customers = get_all_customers()
-    return render_template('customers.html', customers=customers)
+    # صفحه 0 یعنی همه ردیف‌ها مثل قبل
+    page = max(safe_int(request.args.get('page'), 0), 0)
+    per_page = min(max(safe_int(request.args.get('per_page'), 50), 1), MAX_PER_PAGE)
+    limit = per_page if page else None
+    offset = (page - 1) * per_page if page else 0
+    
+    def render():
+        if search_query:
+            customers = search_customers(search_query, limit, offset)
+        else:
+            customers = get_all_customers(limit, offset)
+        return render_template('customers.html', customers=customers,
+                               search_query=search_query, page=page, per_page=per_page)
+    
+    key = ('customers', search_query, page, per_page if page else None)
+    return cached_page_response(page_cache, get_data_version(), key, render)
 
 @app.route('/reports')
 def reports_page():
@@ -458,47 +747,59 @@ def import_export_page():
 
 @app.route('/api/import-excel', methods=['POST'])
 def import_excel():
-    if 'file' not in request.files:
+    files = [file for file in request.files.getlist('file') if file and file.filename]
+    if not files:
         return jsonify({
             'success': False, 
             'message': 'فایلی انتخاب نشده است'
         })
     
-    file = request.files['file']
-    if file.filename == '':
+    if not all(allowed_file(file.filename) for file in files):
         return jsonify({
             'success': False, 
-            'message': 'فایلی انتخاب نشده است'
+            'message': 'فرمت فایل مجاز نیست. فقط فایل‌های xlsx، xls و zip قابل قبول هستند.'
         })
     
-    if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
+    upload_dir = tempfile.mkdtemp(dir=app.config['UPLOAD_FOLDER'])
+    try:
+        file_paths = []
+        for index, file in enumerate(files):
+            extension = file.filename.rsplit('.', 1)[1].lower()
+            filename = f"{index}_{secure_filename(file.filename)}"
+            if not filename.lower().endswith(f'.{extension}'):
+                filename = f"{filename}.{extension}"
+            file_path = os.path.join(upload_dir, filename)
+            file.save(file_path)
+            file_paths.append(file_path)
         
-        try:
-            imported_count = import_from_excel(file_path)
-            return jsonify({
-                'success': True, 
-                'message': f'تعداد {imported_count} رکورد با موفقیت ایمپورت شد'
-            })
-        except Exception as e:
-            return jsonify({
-                'success': False, 
-                'message': str(e)
-            })
-    
-    return jsonify({
-        'success': False, 
-        'message': 'فرمت فایل مجاز نیست. فقط فایل‌های xlsx و xls قابل قبول هستند.'
-    })
+        result = import_from_excel(file_paths)
+        return jsonify({
+            'success': True, 
+            'message': f'تعداد {result["imported"]} رکورد با موفقیت ایمپورت شد',
+            'sheets': result['sheets']
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False, 
+            'message': str(e)
+        })
+    finally:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        cleanup_folder(
+            app.config['UPLOAD_FOLDER'],
+            max_age=app.config['UPLOAD_MAX_AGE'],
+            max_total_size=app.config['UPLOAD_MAX_SIZE']
+        )
 
 @app.route('/api/export-excel')
 def export_excel():
     try:
-        filename = export_to_excel()
+        filepath, filename = export_to_excel(
+            request.args.get('start_date'),
+            request.args.get('end_date')
+        )
         return send_file(
-            os.path.join(app.config['EXPORT_FOLDER'], filename),
+            filepath,
             as_attachment=True,
             download_name=filename
         )
@@ -525,15 +826,14 @@ def get_income_by_date():
         print(f"📅 دریافت درخواست گزارش از {start_date} تا {end_date}")
         
         # استفاده از exit_date به جای entry_date
-        total_income = get_income_by_exit_date_range(start_date, end_date)
-        customers = get_customers_by_exit_date_range(start_date, end_date)
+        total_income, customer_count = get_income_by_exit_date_range(start_date, end_date)
         
-        print(f"📊 نتایج: {len(customers)} مشتری، {total_income} درآمد")
+        print(f"📊 نتایج: {customer_count} مشتری، {total_income} درآمد")
         
         return jsonify({
             'success': True,
             'total_income': total_income,
-            'customer_count': len(customers),
+            'customer_count': customer_count,
             'start_date': start_date,
             'end_date': end_date
         })
@@ -545,34 +845,75 @@ def get_income_by_date():
             'message': f'خطا در محاسبه درآمد: {str(e)}'
         })
 
+@app.route('/api/analytics', methods=['POST'])
+def analytics_query():
+    """گزارش دلخواه: فیلتر، گروه‌بندی و تجمیع روی snapshot"""
+    try:
+        data = request.get_json(silent=True) or {}
+        rows = analytics_snapshot.query(
+            group_by=data.get('group_by'),
+            metrics=data.get('metrics') or ('total_cost',),
+            agg=data.get('agg', 'sum'),
+            start_date=data.get('start_date'),
+            end_date=data.get('end_date'),
+            device_type=data.get('device_type'),
+            closed_only=bool(data.get('closed_only'))
+        )
+        return jsonify({
+            'success': True,
+            'data': rows
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        })
+    except Exception as e:
+        print(f"❌ خطا در گزارش: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'خطا در گزارش: {str(e)}'
+        })
+
+@app.route('/api/analytics/revenue')
+def analytics_revenue():
+    """درآمد به تفکیک نوع وسیله، ماه یا سهم جنس/دستمزد"""
+    try:
+        dimension = request.args.get('by', 'device_type')
+        filters = {
+            'start_date': request.args.get('start_date'),
+            'end_date': request.args.get('end_date')
+        }
+        if dimension == 'split':
+            data = analytics_snapshot.cost_split(**filters)
+        else:
+            data = analytics_snapshot.revenue_by(dimension, **filters)
+        
+        return jsonify({
+            'success': True,
+            'data': data
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        })
+    except Exception as e:
+        print(f"❌ خطا در گزارش: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'خطا در گزارش: {str(e)}'
+        })
+
 @app.route('/api/stats')
 def get_stats():
     """دریافت آمار سیستم"""
     try:
         conn = sqlite3.connect(app.config['DATABASE_PATH'])
-        cursor = conn.cursor()
-        
-        # تعداد کل مشتریان
-        cursor.execute('SELECT COUNT(*) FROM customers')
-        total_customers = cursor.fetchone()[0]
-        
-        # مجموع درآمد
-        cursor.execute('SELECT SUM(total_cost) FROM customers WHERE total_cost IS NOT NULL')
-        total_income_result = cursor.fetchone()[0]
-        total_income = total_income_result if total_income_result is not None else 0
-        
-        # میانگین درآمد
-        cursor.execute('SELECT AVG(total_cost) FROM customers WHERE total_cost IS NOT NULL AND total_cost > 0')
-        average_income_result = cursor.fetchone()[0]
-        average_income = int(average_income_result) if average_income_result is not None else 0
-        
+        stats = fetch_stats(conn)
         conn.close()
         
-        return jsonify({
-            'total_customers': total_customers,
-            'total_income': total_income,
-            'average_income': average_income
-        })
+        return jsonify(stats)
     except Exception as e:
         print(f"Error in get_stats: {e}")
         return jsonify({
@@ -586,27 +927,9 @@ def get_recent_customers():
     """دریافت آخرین مشتریان برای داشبورد"""
     try:
         conn = sqlite3.connect(app.config['DATABASE_PATH'])
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT id, full_name, phone_number, device_type, entry_date, total_cost 
-            FROM customers 
-            ORDER BY created_at DESC 
-            LIMIT 5
-        ''')
-        customers = cursor.fetchall()
+        result = fetch_recent_customers(conn)
         conn.close()
         
-        result = []
-        for customer in customers:
-            result.append({
-                'id': customer[0],
-                'full_name': customer[1],
-                'phone_number': customer[2],
-                'device_type': customer[3],
-                'entry_date': customer[4],
-                'total_cost': customer[5] or 0
-            })
-        
         return jsonify(result)
     except Exception as e:
         print(f"Error in get_recent_customers: {e}")
@@ -617,26 +940,10 @@ def get_customer_details(customer_id):
     """دریافت اطلاعات کامل یک مشتری"""
     try:
         conn = sqlite3.connect(app.config['DATABASE_PATH'])
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM customers WHERE id = ?', (customer_id,))
-        customer = cursor.fetchone()
+        customer_data = fetch_customer(conn, customer_id)
         conn.close()
         
-        if customer:
-            customer_data = {
-                'id': customer[0],
-                'full_name': customer[1],
-                'phone_number': customer[2],
-                'entry_date': customer[3],
-                'exit_date': customer[4],
-                'device_code': customer[5],
-                'device_type': customer[6],
-                'material_cost': customer[7],
-                'service_cost': customer[8],
-                'total_cost': customer[9],
-                'description': customer[10],
-                'created_at': customer[11]
-            }
+        if customer_data:
             return jsonify({
                 'success': True,
                 'data': customer_data
@@ -653,6 +960,124 @@ def get_customer_details(customer_id):
             'message': f'خطا در دریافت اطلاعات: {str(e)}'
         })
 
+@app.route('/api/customer-summary/<phone_number>')
+def get_customer_summary(phone_number):
+    """دریافت خلاصه سوابق یک مشتری بر اساس شماره تماس"""
+    try:
+        conn = sqlite3.connect(app.config['DATABASE_PATH'])
+        cursor = conn.cursor()
+        cursor.execute(
+            f'SELECT {", ".join(SUMMARY_COLUMNS)} FROM customer_summary WHERE phone_number = ?',
+            (phone_number.strip(),)
+        )
+        summary = cursor.fetchone()
+        conn.close()
+        
+        if summary:
+            return jsonify({
+                'success': True,
+                'data': summary_to_dict(summary)
+            })
+        else:
+            return jsonify({
+                'success': False,
+                'message': 'مشتری یافت نشد'
+            })
+            
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'خطا در دریافت اطلاعات: {str(e)}'
+        })
+
+@app.route('/api/top-customers')
+def get_top_customers():
+    """دریافت مشتریان برتر بر اساس مجموع هزینه یا تعداد مراجعه"""
+    try:
+        order_column = 'visit_count' if request.args.get('by') == 'visits' else 'lifetime_total'
+        limit = min(max(safe_int(request.args.get('limit'), 10), 1), 100)
+        
+        conn = sqlite3.connect(app.config['DATABASE_PATH'])
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT {", ".join(SUMMARY_COLUMNS)} FROM customer_summary
+            ORDER BY {order_column} DESC
+            LIMIT ?
+        ''', (limit,))
+        customers = cursor.fetchall()
+        conn.close()
+        
+        return jsonify({
+            'success': True,
+            'data': [summary_to_dict(customer) for customer in customers]
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'خطا در دریافت اطلاعات: {str(e)}'
+        })
+
+@app.route('/api/db-health')
+def get_db_health():
+    """گزارش سلامت، حجم جدول‌ها و استفاده از ایندکس‌ها"""
+    try:
+        conn = sqlite3.connect(app.config['DATABASE_PATH'])
+        report = collect_diagnostics(conn)
+        conn.close()
+        
+        return jsonify({
+            'success': True,
+            'data': report,
+            'last_maintenance': maintenance_scheduler.last_result
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        })
+
+@app.route('/api/db-maintenance', methods=['POST'])
+def db_maintenance():
+    """اجرای دستی نگهداری دیتابیس"""
+    try:
+        result = run_maintenance(app.config['DATABASE_PATH'])
+        maintenance_scheduler.last_result = result
+        
+        return jsonify({
+            'success': True,
+            'data': result
+        })
+    except Exception as e:
+        print(f"❌ خطا در نگهداری دیتابیس: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'خطا در نگهداری دیتابیس: {str(e)}'
+        })
+
+@app.route('/api/backup', methods=['POST'])
+def trigger_backup():
+    """شروع پشتیبان‌گیری در پس‌زمینه"""
+    started = backup_manager.trigger()
+    return jsonify({
+        'success': True,
+        'started': started,
+        'message': 'پشتیبان‌گیری شروع شد' if started else 'پشتیبان‌گیری در حال انجام است'
+    }), 202
+
+@app.route('/api/backup/status')
+def get_backup_status():
+    """وضعیت آخرین پشتیبان‌گیری و لیست نسخه‌ها"""
+    backups = [
+        {'name': os.path.basename(path), 'bytes': os.path.getsize(path)}
+        for path in list_backups(app.config['BACKUP_FOLDER'])
+    ]
+    return jsonify({
+        'success': True,
+        'status': backup_manager.status,
+        'backups': backups
+    })
+
 @app.route('/api/db-info')
 def get_db_info():
     """دریافت اطلاعات دیتابیس"""
@@ -681,6 +1106,9 @@ def get_db_info():
         })
 
 if __name__ == '__main__':
+    # لازم برای استخر پروسس در نسخه executable ویندوز
+    multiprocessing.freeze_support()
+    
     print("=" * 60)
     print("🚀 در حال راه‌اندازی سیستم مدیریت تعمیرگاه...")
     print("=" * 60)
@@ -690,7 +1118,8 @@ if __name__ == '__main__':
     for folder_name, folder_path in [
         ('آپلودها', app.config['UPLOAD_FOLDER']),
         ('خروجی‌ها', app.config['EXPORT_FOLDER']),
-        ('دیتابیس', app.config['DATA_FOLDER'])
+        ('دیتابیس', app.config['DATA_FOLDER']),
+        ('پشتیبان‌ها', app.config['BACKUP_FOLDER'])
     ]:
         if os.path.exists(folder_path):
             print(f"   ✅ {folder_name}: {folder_path}")
@@ -700,10 +1129,17 @@ if __name__ == '__main__':
     
     init_db()
     
+    # در حالت debug، reloader یک پروسس والد فقط برای پاییدن فایل‌ها دارد؛
+    # زمان‌بندها فقط در پروسس سرور شروع می‌شوند تا دو نسخه اجرا نشوند
+    debug = True
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        maintenance_scheduler.start()
+        backup_manager.start()
+    
     print("🌐 سیستم آماده است!")
     print("📊 آدرس: http://localhost:5000")
     print("💾 داده‌ها در فایل دیتابیس ذخیره می‌شوند")
     print("⏹️  برای توقف، Ctrl+C را فشار دهید")
     print("=" * 60)
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    app.run(debug=debug, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,244 @@
+"""لایه ASGI برای endpointهای پرخواندن و طولانی
+
+درخواست‌ها روی event loop منتظر می‌مانند و کار دیتابیس به یک استخر کوچک
+رشته با اتصال‌های فقط‌خواندنی سپرده می‌شود؛ پس کلاینت‌های کند رشته‌ها را
+اشغال نمی‌کنند. مسیرهای دیگر از طریق asgiref به برنامه Flask فرستاده
+می‌شوند.
+
+این برنامه به جای python app.py اجرا می‌شود، نه کنار آن؛ دو پروسس یعنی دو
+رشته نویسنده روی یک دیتابیس:
+    uvicorn async_api:create_app --factory --port 5000
+"""
+import os
+import re
+import json
+import asyncio
+import sqlite3
+import threading
+from functools import partial
+from urllib.parse import parse_qs
+from concurrent.futures import ThreadPoolExecutor
+
+from queries import (
+    fetch_stats, fetch_recent_customers, fetch_customer, search_customer_rows,
+    fetch_customer_page, customer_to_dict
+)
+
+try:
+    from asgiref.sync import sync_to_async
+    from asgiref.wsgi import WsgiToAsgiInstance
+except ImportError:
+    WsgiToAsgiInstance = None
+
+
+class DatabaseExecutor:
+    """اجرای کوئری‌ها در استخر رشته با یک اتصال فقط‌خواندنی برای هر رشته"""
+
+    def __init__(self, db_path, max_workers=4):
+        self.db_path = db_path
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='db-read')
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            uri = f"file:{os.path.abspath(self.db_path)}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, timeout=30, check_same_thread=False)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _call(self, func, args):
+        return func(self._connection(), *args)
+
+    async def run(self, func, *args):
+        """اجرای func(conn, *args) در استخر و انتظار غیرمسدودکننده برای نتیجه"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, self._call, func, args)
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+
+class ThreadedWsgi:
+    """اجرای برنامه WSGI (Flask) در یک استخر رشته از طریق asgiref
+
+    WsgiToAsgi پیش‌فرض همه درخواست‌ها را روی یک رشته مشترک اجرا می‌کند؛
+    اینجا هر درخواست در رشته آزاد استخر اجرا می‌شود تا یک ایمپورت یا خروجی
+    طولانی بقیه درخواست‌ها را معطل نکند.
+    """
+
+    def __init__(self, wsgi_app, max_workers=8):
+        self.wsgi_app = wsgi_app
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='wsgi')
+        self._run = WsgiToAsgiInstance.__dict__['run_wsgi_app'].func
+
+    async def __call__(self, scope, receive, send):
+        instance = WsgiToAsgiInstance(self.wsgi_app)
+        instance.run_wsgi_app = sync_to_async(
+            partial(self._run, instance), thread_sensitive=False, executor=self._pool
+        )
+        await instance(scope, receive, send)
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+
+class AsyncAPI:
+    """برنامه ASGI با مسیرهای JSON فقط‌خواندنی"""
+
+    def __init__(self, db_path, fallback=None, max_workers=4, stream_chunk=500,
+                 on_startup=(), on_shutdown=()):
+        self.db = DatabaseExecutor(db_path, max_workers)
+        self.fallback = fallback
+        self.on_startup = list(on_startup)
+        self.on_shutdown = list(on_shutdown)
+        self.stream_chunk = stream_chunk
+        self.routes = [
+            (re.compile(r'^/api/stats$'), self.stats),
+            (re.compile(r'^/api/recent-customers$'), self.recent_customers),
+            (re.compile(r'^/api/customer/(\d+)$'), self.customer_details),
+            (re.compile(r'^/api/search$'), self.search),
+            (re.compile(r'^/api/customers/stream$'), self.stream_customers),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            for pattern, handler in self.routes:
+                match = pattern.match(scope['path'])
+                if match:
+                    await handler(scope, send, *match.groups())
+                    return
+
+        if self.fallback is not None:
+            await self.fallback(scope, receive, send)
+        else:
+            await send_json(send, {'success': False, 'message': 'مسیر یافت نشد'}, status=404)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                for callback in self.on_startup:
+                    callback()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for callback in self.on_shutdown:
+                    callback()
+                self.db.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def stats(self, scope, send):
+        """دریافت آمار سیستم"""
+        try:
+            await send_json(send, await self.db.run(fetch_stats))
+        except Exception as e:
+            print(f"Error in get_stats: {e}")
+            await send_json(send, {'total_customers': 0, 'total_income': 0, 'average_income': 0})
+
+    async def recent_customers(self, scope, send):
+        """دریافت آخرین مشتریان برای داشبورد"""
+        try:
+            await send_json(send, await self.db.run(fetch_recent_customers))
+        except Exception as e:
+            print(f"Error in get_recent_customers: {e}")
+            await send_json(send, [])
+
+    async def customer_details(self, scope, send, customer_id):
+        """دریافت اطلاعات کامل یک مشتری"""
+        try:
+            customer_data = await self.db.run(fetch_customer, int(customer_id))
+            if customer_data:
+                await send_json(send, {'success': True, 'data': customer_data})
+            else:
+                await send_json(send, {'success': False, 'message': 'مشتری یافت نشد'})
+        except Exception as e:
+            await send_json(send, {'success': False, 'message': f'خطا در دریافت اطلاعات: {str(e)}'})
+
+    async def search(self, scope, send):
+        """جستجوی مشتریان: /api/search?q=...&limit=..."""
+        params = query_params(scope)
+        query = params.get('q', '').strip()
+        try:
+            limit = min(max(int(params.get('limit', 100)), 1), 1000)
+        except ValueError:
+            limit = 100
+        try:
+            rows = await self.db.run(search_customer_rows, query, limit) if query else []
+            await send_json(send, {'success': True, 'data': [customer_to_dict(row) for row in rows]})
+        except Exception as e:
+            await send_json(send, {'success': False, 'message': f'خطا در جستجو: {str(e)}'})
+
+    async def stream_customers(self, scope, send):
+        """ارسال همه مشتریان به صورت NDJSON، تکه به تکه"""
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'content-type', b'application/x-ndjson; charset=utf-8')],
+        })
+        before_id = None
+        while True:
+            rows = await self.db.run(fetch_customer_page, before_id, self.stream_chunk)
+            if not rows:
+                break
+            body = ''.join(
+                json.dumps(customer_to_dict(row), ensure_ascii=False) + '\n' for row in rows
+            ).encode('utf-8')
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+            before_id = rows[-1][0]
+        await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+
+
+def query_params(scope):
+    """پارامترهای query string با اولین مقدار هر کلید"""
+    parsed = parse_qs(scope.get('query_string', b'').decode('utf-8'))
+    return {key: values[0] for key, values in parsed.items()}
+
+
+async def send_json(send, data, status=200):
+    body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json; charset=utf-8'),
+            (b'content-length', str(len(body)).encode('ascii')),
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def create_app(wsgi_workers=8):
+    """ساخت برنامه ASGI که تنها سرور برنامه است و بقیه مسیرها را به Flask می‌دهد
+
+    مسیرهای Flask در استخری با wsgi_workers رشته اجرا می‌شوند و زمان‌بندهای
+    نگهداری و پشتیبان‌گیری در lifespan شروع و متوقف می‌شوند.
+    """
+    if WsgiToAsgiInstance is None:
+        raise RuntimeError('برای اجرای لایه async کتابخانه asgiref لازم است: pip install asgiref')
+
+    from app import (
+        app as flask_app, init_db, write_queue, maintenance_scheduler, backup_manager
+    )
+
+    init_db()
+    fallback = ThreadedWsgi(flask_app, wsgi_workers)
+    return AsyncAPI(
+        flask_app.config['DATABASE_PATH'],
+        fallback=fallback,
+        on_startup=[maintenance_scheduler.start, backup_manager.start],
+        on_shutdown=[maintenance_scheduler.stop, backup_manager.stop, fallback.close,
+                     write_queue.stop]
+    )
@@ -0,0 +1,253 @@
+import os
+import sys
+import gzip
+import time
+import shutil
+import sqlite3
+import argparse
+import threading
+from datetime import datetime
+
+DEFAULT_DB_PATH = os.path.join('data', 'repair_shop.db')
+DEFAULT_BACKUP_FOLDER = 'backups'
+BACKUP_PREFIX = 'repair_shop_'
+BACKUP_SUFFIX = '.db.gz'
+
+
+def _copy_online(src_path, dst_path, pages=64, sleep=0.005):
+    """کپی دیتابیس با API پشتیبان‌گیری SQLite در گام‌های کوچک
+
+    بین هر گام قفل رها می‌شود تا برنامه در حال اجرا متوقف نشود.
+    """
+    src = sqlite3.connect(src_path, timeout=30)
+    dst = sqlite3.connect(dst_path, timeout=30)
+    try:
+        src.backup(dst, pages=pages, sleep=sleep)
+    finally:
+        dst.close()
+        src.close()
+
+
+def _read_changes(db_path):
+    """مقدار شمارنده data_version یا 0 اگر دیتابیس یا جدول وجود نداشته باشد"""
+    if not os.path.exists(db_path):
+        return 0
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        row = conn.execute('SELECT changes FROM data_version WHERE id = 1').fetchone()
+        return row[0] if row else 0
+    except sqlite3.Error:
+        return 0
+    finally:
+        conn.close()
+
+
+def list_backups(backup_folder=DEFAULT_BACKUP_FOLDER):
+    """لیست فایل‌های پشتیبان از جدیدترین به قدیمی‌ترین"""
+    if not os.path.isdir(backup_folder):
+        return []
+    names = [
+        name for name in os.listdir(backup_folder)
+        if name.startswith(BACKUP_PREFIX) and name.endswith(BACKUP_SUFFIX)
+    ]
+    return [os.path.join(backup_folder, name) for name in sorted(names, reverse=True)]
+
+
+def rotate_backups(backup_folder=DEFAULT_BACKUP_FOLDER, keep=14):
+    """حذف پشتیبان‌های قدیمی و نگه داشتن keep نسخه آخر"""
+    removed = 0
+    for path in list_backups(backup_folder)[keep:]:
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def create_backup(db_path=DEFAULT_DB_PATH, backup_folder=DEFAULT_BACKUP_FOLDER, keep=14):
+    """ساخت یک نسخه پشتیبان فشرده از دیتابیس در حال اجرا"""
+    os.makedirs(backup_folder, exist_ok=True)
+    started = time.time()
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    snapshot_path = os.path.join(backup_folder, f"{BACKUP_PREFIX}{stamp}.db.tmp")
+    backup_path = os.path.join(backup_folder, f"{BACKUP_PREFIX}{stamp}{BACKUP_SUFFIX}")
+    partial_path = f"{backup_path}.tmp"
+
+    try:
+        _copy_online(db_path, snapshot_path)
+        with open(snapshot_path, 'rb') as src, gzip.open(partial_path, 'wb', compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(partial_path, backup_path)
+    finally:
+        for path in (snapshot_path, partial_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    rotate_backups(backup_folder, keep)
+    result = {
+        'path': backup_path,
+        'bytes': os.path.getsize(backup_path),
+        'seconds': round(time.time() - started, 3),
+        'created_at': stamp,
+    }
+    print(f"💾 نسخه پشتیبان ساخته شد: {backup_path} ({result['bytes']} بایت)")
+    return result
+
+
+def restore_backup(backup_path, db_path=DEFAULT_DB_PATH):
+    """بازگردانی یک نسخه پشتیبان روی دیتابیس
+
+    نسخه پشتیبان ابتدا از حالت فشرده خارج و بررسی سلامت می‌شود، سپس با
+    همان API پشتیبان‌گیری روی دیتابیس اصلی نوشته می‌شود.
+
+    کش خروجی‌ها و صفحات با نسخه داده (بزرگ‌ترین شناسه و شمارنده تغییرات)
+    کلید می‌خورند؛ برای اینکه بعد از بازگردانی هیچ نسخه قبلی دوباره با
+    داده دیگری تکرار نشود، شمارنده از مقدار پیش از بازگردانی بالاتر برده
+    می‌شود. کش‌های داخل حافظه برنامه را فقط بستن آن پاک می‌کند، پس
+    بازگردانی باید وقتی برنامه بسته است انجام شود.
+    """
+    if not os.path.exists(backup_path):
+        raise FileNotFoundError(f'فایل پشتیبان یافت نشد: {backup_path}')
+
+    restore_path = f"{db_path}.restore.tmp"
+    try:
+        if backup_path.endswith('.gz'):
+            with gzip.open(backup_path, 'rb') as src, open(restore_path, 'wb') as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+        else:
+            shutil.copyfile(backup_path, restore_path)
+
+        conn = sqlite3.connect(restore_path)
+        try:
+            check = conn.execute('PRAGMA quick_check').fetchone()[0]
+        finally:
+            conn.close()
+        if check != 'ok':
+            raise ValueError(f'فایل پشتیبان سالم نیست: {check}')
+
+        changes = max(_read_changes(db_path), _read_changes(restore_path)) + 1
+        conn = sqlite3.connect(restore_path)
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS data_version (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    changes INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            conn.execute('INSERT OR REPLACE INTO data_version (id, changes) VALUES (1, ?)', (changes,))
+            conn.commit()
+        finally:
+            conn.close()
+
+        _copy_online(restore_path, db_path, pages=-1, sleep=0)
+    finally:
+        if os.path.exists(restore_path):
+            os.remove(restore_path)
+
+    print(f"♻️ دیتابیس از نسخه پشتیبان بازگردانی شد: {backup_path}")
+
+
+class BackupManager:
+    """اجرای پشتیبان‌گیری در پس‌زمینه، دستی یا زمان‌بندی‌شده
+
+    زمان‌بندی بر اساس سن جدیدترین فایل پشتیبان است، پس اگر برنامه کمتر از
+    interval باز بماند هم نسخه عقب‌افتاده بلافاصله بعد از شروع ساخته می‌شود.
+    """
+
+    # فاصله بررسی دوباره بعد از شروع یک پشتیبان‌گیری (ثانیه)
+    retry_interval = 3600
+
+    def __init__(self, db_path, backup_folder, interval=0, keep=14):
+        self.db_path = db_path
+        self.backup_folder = backup_folder
+        self.interval = interval
+        self.keep = keep
+        self.status = {'running': False, 'last_result': None, 'last_error': None}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._scheduler = None
+
+    def trigger(self):
+        """شروع پشتیبان‌گیری در پس‌زمینه؛ False اگر یکی در حال اجراست"""
+        with self._lock:
+            if self.status['running']:
+                return False
+            self.status['running'] = True
+        threading.Thread(target=self._run_once, name='db-backup', daemon=True).start()
+        return True
+
+    def start(self):
+        """شروع پشتیبان‌گیری زمان‌بندی‌شده"""
+        if self._scheduler is None and self.interval > 0:
+            self._scheduler = threading.Thread(
+                target=self._schedule, name='db-backup-scheduler', daemon=True
+            )
+            self._scheduler.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def seconds_until_due(self):
+        backups = list_backups(self.backup_folder)
+        if not backups:
+            return 0
+        age = time.time() - os.path.getmtime(backups[0])
+        return max(0, self.interval - age)
+
+    def _schedule(self):
+        delay = 0
+        while not self._stop.wait(delay):
+            delay = self.seconds_until_due()
+            if delay > 0:
+                continue
+            self.trigger()
+            # اگر پشتیبان‌گیری شکست بخورد، بعد از این فاصله دوباره تلاش می‌شود
+            delay = min(self.interval, self.retry_interval)
+
+    def _run_once(self):
+        try:
+            result = create_backup(self.db_path, self.backup_folder, self.keep)
+            self.status['last_result'] = result
+            self.status['last_error'] = None
+        except Exception as e:
+            print(f"❌ خطا در پشتیبان‌گیری: {e}")
+            self.status['last_error'] = str(e)
+        finally:
+            with self._lock:
+                self.status['running'] = False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='پشتیبان‌گیری و بازگردانی دیتابیس تعمیرگاه')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='مسیر فایل دیتابیس')
+    parser.add_argument('--folder', default=DEFAULT_BACKUP_FOLDER, help='پوشه نسخه‌های پشتیبان')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    create_parser = subparsers.add_parser('create', help='ساخت نسخه پشتیبان')
+    create_parser.add_argument('--keep', type=int, default=14, help='تعداد نسخه‌های نگه‌داشته‌شده')
+    subparsers.add_parser('list', help='نمایش نسخه‌های پشتیبان')
+    restore_parser = subparsers.add_parser('restore', help='بازگردانی نسخه پشتیبان (برنامه باید بسته باشد)')
+    restore_parser.add_argument('backup', nargs='?', help='فایل پشتیبان (پیش‌فرض: جدیدترین)')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'create':
+        create_backup(args.db, args.folder, args.keep)
+    elif args.command == 'list':
+        for path in list_backups(args.folder):
+            print(f"   - {path} ({os.path.getsize(path)} بایت)")
+    else:
+        backup_path = args.backup
+        if not backup_path:
+            backups = list_backups(args.folder)
+            if not backups:
+                print("❌ هیچ نسخه پشتیبانی پیدا نشد")
+                return 1
+            backup_path = backups[0]
+        restore_backup(backup_path, args.db)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
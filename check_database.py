@@ -1,12 +1,23 @@
 import sqlite3
 import os
+import sys
+import time
+import argparse
+import threading
 
-def check_database():
+DEFAULT_DB_PATH = os.path.join('data', 'repair_shop.db')
+
+# کوئری‌های پرتکرار برنامه برای بررسی استفاده از ایندکس‌ها
+SAMPLE_QUERIES = {
+    'search_by_phone': ("SELECT * FROM customers WHERE phone_number = ?", ('',)),
+    'customer_by_id': ("SELECT * FROM customers WHERE id = ?", (0,)),
+    'recent_customers': ("SELECT id FROM customers ORDER BY created_at DESC LIMIT 5", ()),
+    'top_customers': ("SELECT phone_number FROM customer_summary ORDER BY lifetime_total DESC LIMIT 10", ()),
+}
+
+def check_database(db_path=DEFAULT_DB_PATH):
     """بررسی وضعیت دیتابیس"""
     
-    # مسیر دیتابیس
-    db_path = os.path.join('data', 'repair_shop.db')
-    
     print("🔍 بررسی وضعیت دیتابیس...")
     print(f"📁 مسیر دیتابیس: {db_path}")
     
@@ -42,6 +53,8 @@ def check_database():
                     print("📝 آخرین مشتریان:")
                     for customer in recent_customers:
                         print(f"   - ID: {customer[0]}, نام: {customer[1]}, تلفن: {customer[2]}")
+                
+                print_diagnostics(collect_diagnostics(conn))
             else:
                 print("❌ جدول customers وجود ندارد")
                 
@@ -54,6 +67,221 @@ def check_database():
         print("❌ فایل دیتابیس وجود ندارد")
         print("💡 راه حل: سیستم را یکبار اجرا کنید تا دیتابیس ایجاد شود")
 
+def _pragma(cursor, name):
+    cursor.execute(f'PRAGMA {name}')
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+def collect_diagnostics(conn):
+    """جمع‌آوری اطلاعات سلامت و حجم دیتابیس"""
+    cursor = conn.cursor()
+    page_size = _pragma(cursor, 'page_size')
+    page_count = _pragma(cursor, 'page_count')
+    freelist_count = _pragma(cursor, 'freelist_count')
+    
+    report = {
+        'page_size': page_size,
+        'page_count': page_count,
+        'freelist_count': freelist_count,
+        'freelist_ratio': round(freelist_count / page_count, 3) if page_count else 0,
+        'file_bytes': page_size * page_count,
+        'journal_mode': _pragma(cursor, 'journal_mode'),
+        'auto_vacuum': _pragma(cursor, 'auto_vacuum'),
+        'tables': {},
+        'indexes': {},
+        'query_plans': {},
+    }
+    
+    # حجم هر جدول و ایندکس (در صورت وجود dbstat)
+    sizes = {}
+    try:
+        cursor.execute('SELECT name, SUM(pgsize) FROM dbstat GROUP BY name')
+        sizes = dict(cursor.fetchall())
+    except sqlite3.Error:
+        pass
+    
+    cursor.execute("""
+        SELECT type, name, tbl_name FROM sqlite_master
+        WHERE type IN ('table', 'index') AND name NOT LIKE 'sqlite_%'
+        ORDER BY type, name
+    """)
+    for obj_type, name, table in cursor.fetchall():
+        if obj_type == 'table':
+            cursor.execute(f'SELECT COUNT(*) FROM "{name}"')
+            report['tables'][name] = {'rows': cursor.fetchone()[0], 'bytes': sizes.get(name)}
+        else:
+            report['indexes'][name] = {'table': table, 'bytes': sizes.get(name), 'used_by': []}
+    
+    # کدام کوئری‌ها از کدام ایندکس استفاده می‌کنند
+    for label, (sql, params) in SAMPLE_QUERIES.items():
+        try:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        except sqlite3.Error:
+            continue
+        plan = [row[-1] for row in cursor.fetchall()]
+        report['query_plans'][label] = plan
+        for index_name, info in report['indexes'].items():
+            if any(index_name in step for step in plan):
+                info['used_by'].append(label)
+    
+    return report
+
+def print_diagnostics(report):
+    """نمایش گزارش سلامت دیتابیس"""
+    print("🩺 گزارش سلامت دیتابیس:")
+    print(f"   - صفحات: {report['page_count']} × {report['page_size']} بایت")
+    print(f"   - صفحات آزاد: {report['freelist_count']} ({report['freelist_ratio'] * 100:.1f}%)")
+    print(f"   - حالت ژورنال: {report['journal_mode']}، auto_vacuum: {report['auto_vacuum']}")
+    for name, info in report['tables'].items():
+        size = f"، {info['bytes']} بایت" if info['bytes'] is not None else ''
+        print(f"   - جدول {name}: {info['rows']} ردیف{size}")
+    for name, info in report['indexes'].items():
+        used_by = '، '.join(info['used_by']) or 'بدون استفاده در کوئری‌های نمونه'
+        print(f"   - ایندکس {name} ({info['table']}): {used_by}")
+
+def last_maintenance_path(db_path):
+    """فایل کنار دیتابیس که زمان آخرین نگهداری موفق در آن نوشته می‌شود"""
+    return f"{db_path}.last_maintenance"
+
+def last_maintenance_time(db_path):
+    """زمان آخرین نگهداری موفق (ثانیه از epoch) یا None"""
+    try:
+        with open(last_maintenance_path(db_path), encoding='utf-8') as f:
+            return float(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+def run_maintenance(db_path=DEFAULT_DB_PATH, vacuum_threshold=0.2, full_vacuum=False):
+    """اجرای نگهداری دوره‌ای دیتابیس
+
+    آمار planner به‌روز می‌شود، صفحات آزاد پس گرفته می‌شوند، سلامت فایل
+    بررسی می‌شود و WAL به فایل اصلی منتقل و کوتاه می‌شود.
+
+    VACUUM کامل کل فایل را بازنویسی می‌کند و در این مدت قفل نوشتن را نگه
+    می‌دارد، پس فقط با full_vacuum=True (از خط فرمان و وقتی برنامه بسته است)
+    اجرا می‌شود؛ داخل برنامه فقط در نتیجه توصیه می‌شود.
+    """
+    started = time.time()
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    cursor = conn.cursor()
+    result = {}
+    try:
+        before = collect_diagnostics(conn)
+        
+        # به‌روزرسانی آمار برای planner؛ با analysis_limit نمونه‌برداری می‌شود
+        # تا روی جدول‌های بزرگ هم قفل نوشتن فقط کوتاه گرفته شود
+        cursor.execute('PRAGMA analysis_limit = 1000')
+        cursor.execute('ANALYZE')
+        cursor.execute('PRAGMA optimize')
+        
+        # پس گرفتن فضای حذف‌شده‌ها
+        if before['auto_vacuum'] == 2:
+            # execute فقط یک قدم pragma را اجرا می‌کند (یک صفحه)؛ executescript تا آخر
+            conn.executescript('PRAGMA incremental_vacuum;')
+            result['vacuum'] = 'incremental'
+        elif before['freelist_ratio'] >= vacuum_threshold and not full_vacuum:
+            result['vacuum'] = 'full_recommended'
+        elif before['freelist_ratio'] >= vacuum_threshold:
+            # یک بار VACUUM کامل تا حالت incremental فعال شود
+            cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            cursor.execute('VACUUM')
+            result['vacuum'] = 'full'
+        else:
+            result['vacuum'] = 'skipped'
+        
+        cursor.execute('PRAGMA quick_check')
+        checks = [row[0] for row in cursor.fetchall()]
+        result['quick_check'] = 'ok' if checks == ['ok'] else checks
+        
+        cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        result['wal_checkpoint'] = list(cursor.fetchone())
+        
+        after = collect_diagnostics(conn)
+        result['pages_before'] = before['page_count']
+        result['pages_after'] = after['page_count']
+        result['freelist_before'] = before['freelist_count']
+        result['freelist_after'] = after['freelist_count']
+        result['report'] = after
+    finally:
+        conn.close()
+    
+    result['seconds'] = round(time.time() - started, 3)
+    with open(last_maintenance_path(db_path), 'w', encoding='utf-8') as f:
+        f.write(str(time.time()))
+    print(f"🛠️ نگهداری دیتابیس انجام شد: {result['pages_before']} ← {result['pages_after']} صفحه، "
+          f"بررسی سلامت: {result['quick_check']}")
+    if result['vacuum'] == 'full_recommended':
+        print("💡 صفحات آزاد زیاد است؛ برای VACUUM کامل برنامه را ببندید و "
+              "python check_database.py --maintain را اجرا کنید")
+    return result
+
+class MaintenanceScheduler:
+    """اجرای دوره‌ای run_maintenance در یک رشته پس‌زمینه
+
+    زمان آخرین اجرا روی دیسک نگه داشته می‌شود، پس اگر برنامه هر روز بسته و
+    باز شود، نگهداری عقب‌افتاده بلافاصله بعد از شروع انجام می‌شود.
+    """
+    
+    # فاصله تلاش دوباره بعد از خطا (ثانیه)
+    retry_interval = 3600
+    
+    def __init__(self, db_path, interval):
+        self.db_path = db_path
+        self.interval = interval
+        self.last_result = None
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(
+                target=self._run, name='db-maintenance', daemon=True
+            )
+            self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+    
+    def seconds_until_due(self):
+        last_run = last_maintenance_time(self.db_path)
+        if last_run is None:
+            return 0
+        return max(0, last_run + self.interval - time.time())
+    
+    def _run(self):
+        delay = 0
+        while not self._stop.wait(delay):
+            delay = self.seconds_until_due()
+            if delay > 0:
+                continue
+            try:
+                self.last_result = run_maintenance(self.db_path)
+                delay = self.interval
+            except Exception as e:
+                print(f"⚠️ خطا در نگهداری دیتابیس: {e}")
+                delay = min(self.interval, self.retry_interval)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='بررسی و نگهداری دیتابیس تعمیرگاه')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='مسیر فایل دیتابیس')
+    parser.add_argument('--maintain', action='store_true',
+                        help='اجرای ANALYZE، vacuum، quick_check و checkpoint '
+                             '(VACUUM کامل فقط از اینجا؛ برنامه را قبلش ببندید)')
+    args = parser.parse_args(argv)
+    
+    if args.maintain:
+        if not os.path.exists(args.db):
+            print("❌ فایل دیتابیس وجود ندارد")
+            return 1
+        result = run_maintenance(args.db, full_vacuum=True)
+        print_diagnostics(result['report'])
+    else:
+        check_database(args.db)
+    return 0
+
 if __name__ == '__main__':
-    check_database()
-    input("\n↵ برای خروج Enter بزنید...")
\ No newline at end of file
+    exit_code = main()
+    # وقتی با دابل‌کلیک اجرا شده، پنجره بلافاصله بسته نشود
+    if len(sys.argv) == 1:
+        input("\n↵ برای خروج Enter بزنید...")
+    sys.exit(exit_code)
\ No newline at end of file
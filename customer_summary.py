@@ -0,0 +1,130 @@
+"""خلاصه سوابق هر مشتری بر اساس شماره تماس
+
+جدول customer_summary با تریگرهای روی جدول customers به‌روز نگه داشته
+می‌شود؛ هر نوشتن فقط ردیف خلاصه همان شماره تماس را دوباره حساب می‌کند.
+"""
+
+SUMMARY_COLUMNS = (
+    'phone_number', 'full_name', 'visit_count', 'first_visit', 'last_visit',
+    'lifetime_total', 'open_jobs', 'last_device', 'updated_at'
+)
+
+# با تغییر محاسبه خلاصه بالا برده می‌شود تا تریگرها و داده‌ها دوباره ساخته شوند
+SUMMARY_SCHEMA_VERSION = 1
+
+
+def normalized_date_sql(column):
+    """معادل SQL تابع normalize_persian_date: 1403/9/5 → 1403/09/05
+
+    تاریخ‌ها نرمال نشده ذخیره می‌شوند و مقایسه متنی خام ترتیب اشتباه می‌دهد.
+    """
+    date = f"replace(trim({column}), ' ', '')"
+    rest = f"substr({date}, instr({date}, '/') + 1)"
+    year = f"substr({date}, 1, instr({date}, '/') - 1)"
+    month = f"substr({rest}, 1, instr({rest}, '/') - 1)"
+    day = f"substr({rest}, instr({rest}, '/') + 1)"
+    return (
+        f"CASE WHEN length({date}) - length(replace({date}, '/', '')) = 2 THEN "
+        f"{year} || '/' || substr('00' || {month}, -max(2, length({month}))) || '/' || "
+        f"substr('00' || {day}, -max(2, length({day}))) END"
+    )
+
+
+# محاسبه دوباره خلاصه یک شماره تماس؛ {phone} با NEW/OLD جایگزین می‌شود
+_REFRESH_SQL = '''
+    DELETE FROM customer_summary WHERE phone_number = {phone};
+    INSERT INTO customer_summary
+        (phone_number, full_name, visit_count, first_visit, last_visit,
+         lifetime_total, open_jobs, last_device, updated_at)
+    SELECT
+        phone_number,
+        (SELECT full_name FROM customers WHERE phone_number = {phone} ORDER BY id DESC LIMIT 1),
+        COUNT(*),
+        MIN({entry_date}),
+        MAX({entry_date}),
+        COALESCE(SUM(total_cost), 0),
+        SUM(CASE WHEN exit_date IS NULL OR exit_date = '' THEN 1 ELSE 0 END),
+        (SELECT device_type FROM customers WHERE phone_number = {phone} ORDER BY id DESC LIMIT 1),
+        CURRENT_TIMESTAMP
+    FROM customers
+    WHERE phone_number = {phone}
+    GROUP BY phone_number;
+'''
+
+
+def init_customer_summary(cursor):
+    """ایجاد جدول خلاصه، ایندکس‌ها و تریگرها و پر کردن اولیه آن"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS customer_summary (
+            phone_number TEXT PRIMARY KEY,
+            full_name TEXT,
+            visit_count INTEGER NOT NULL DEFAULT 0,
+            first_visit TEXT,
+            last_visit TEXT,
+            lifetime_total INTEGER NOT NULL DEFAULT 0,
+            open_jobs INTEGER NOT NULL DEFAULT 0,
+            last_device TEXT,
+            updated_at DATETIME
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_customers_phone ON customers (phone_number)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_summary_total ON customer_summary (lifetime_total DESC)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_summary_visits ON customer_summary (visit_count DESC)')
+
+    cursor.execute('PRAGMA user_version')
+    outdated = cursor.fetchone()[0] < SUMMARY_SCHEMA_VERSION
+
+    entry_date = normalized_date_sql('entry_date')
+    triggers = {
+        'insert': _REFRESH_SQL.format(phone='NEW.phone_number', entry_date=entry_date),
+        'delete': _REFRESH_SQL.format(phone='OLD.phone_number', entry_date=entry_date),
+        'update': (
+            _REFRESH_SQL.format(phone='OLD.phone_number', entry_date=entry_date)
+            + _REFRESH_SQL.format(phone='NEW.phone_number', entry_date=entry_date)
+        ),
+    }
+    for event, body in triggers.items():
+        if outdated:
+            cursor.execute(f'DROP TRIGGER IF EXISTS customers_summary_{event}')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS customers_summary_{event}
+            AFTER {event.upper()} ON customers
+            BEGIN
+                {body}
+            END
+        ''')
+
+    # دیتابیس‌های قدیمی که قبل از این جدول (یا این نسخه از آن) ساخته شده‌اند
+    cursor.execute('SELECT COUNT(*) FROM customer_summary')
+    if outdated or cursor.fetchone()[0] == 0:
+        rebuild_customer_summary(cursor)
+    if outdated:
+        cursor.execute(f'PRAGMA user_version = {SUMMARY_SCHEMA_VERSION}')
+
+
+def rebuild_customer_summary(cursor):
+    """ساخت دوباره کل جدول خلاصه از روی customers"""
+    cursor.execute('DELETE FROM customer_summary')
+    cursor.execute('''
+        INSERT INTO customer_summary
+            (phone_number, full_name, visit_count, first_visit, last_visit,
+             lifetime_total, open_jobs, last_device, updated_at)
+        SELECT
+            c.phone_number,
+            (SELECT full_name FROM customers WHERE phone_number = c.phone_number ORDER BY id DESC LIMIT 1),
+            COUNT(*),
+            MIN({entry_date}),
+            MAX({entry_date}),
+            COALESCE(SUM(c.total_cost), 0),
+            SUM(CASE WHEN c.exit_date IS NULL OR c.exit_date = '' THEN 1 ELSE 0 END),
+            (SELECT device_type FROM customers WHERE phone_number = c.phone_number ORDER BY id DESC LIMIT 1),
+            CURRENT_TIMESTAMP
+        FROM customers c
+        GROUP BY c.phone_number
+    '''.format(entry_date=normalized_date_sql('c.entry_date')))
+    return cursor.rowcount
+
+
+def summary_to_dict(row):
+    """تبدیل یک ردیف خلاصه به دیکشنری برای JSON"""
+    return dict(zip(SUMMARY_COLUMNS, row))
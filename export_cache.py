@@ -0,0 +1,94 @@
+import os
+import time
+import hashlib
+import threading
+
+
+class ExportCache:
+    """کش فایل‌های اکسپورت بر اساس نسخه داده
+
+    کلید هر خروجی از نسخه داده و محدوده گزارش ساخته می‌شود؛ تا وقتی داده
+    تغییر نکرده، همان فایل قبلی بدون ساخت دوباره برگردانده می‌شود.
+    """
+
+    def __init__(self, folder, prefix='cache_', extension='.xlsx'):
+        self.folder = folder
+        self.prefix = prefix
+        self.extension = extension
+        self._lock = threading.Lock()
+
+    def path_for(self, key):
+        """مسیر فایل کش برای یک کلید"""
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+        return os.path.join(self.folder, f"{self.prefix}{digest}{self.extension}")
+
+    def get_or_create(self, key, build):
+        """برگرداندن مسیر فایل کش؛ در صورت نبود، build(path) آن را می‌سازد
+
+        خروجی (path, hit) است که hit نشان می‌دهد فایل از کش آمده یا نه.
+        """
+        path = self.path_for(key)
+        with self._lock:
+            if os.path.exists(path):
+                # به‌روزرسانی زمان دسترسی برای سیاست حذف
+                os.utime(path, None)
+                return path, True
+
+            # ساخت در فایل موقت تا فایل نیمه‌کاره هیچ‌وقت سرو نشود
+            tmp_path = f"{path}.tmp{self.extension}"
+            try:
+                build(tmp_path)
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            return path, False
+
+
+def cleanup_folder(folder, max_age=None, max_total_size=None, keep=()):
+    """حذف فایل‌های قدیمی و کم‌استفاده از یک پوشه
+
+    ابتدا فایل‌های قدیمی‌تر از max_age ثانیه حذف می‌شوند، سپس اگر حجم کل
+    بیشتر از max_total_size بایت بود، قدیمی‌ترین‌ها تا رسیدن به سقف حذف
+    می‌شوند. مسیرهای داخل keep هرگز حذف نمی‌شوند.
+    """
+    if not os.path.isdir(folder):
+        return 0
+
+    keep = {os.path.abspath(path) for path in keep}
+    now = time.time()
+    files = []
+    for entry in os.scandir(folder):
+        if entry.is_file() and os.path.abspath(entry.path) not in keep:
+            stat = entry.stat()
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+
+    removed = 0
+    remaining = []
+    for mtime, size, path in files:
+        if max_age is not None and now - mtime > max_age:
+            if _remove(path):
+                removed += 1
+                continue
+        remaining.append((mtime, size, path))
+
+    if max_total_size is not None:
+        total_size = sum(size for _, size, _ in remaining)
+        for mtime, size, path in sorted(remaining):
+            if total_size <= max_total_size:
+                break
+            if _remove(path):
+                removed += 1
+                total_size -= size
+
+    if removed:
+        print(f"🧹 {removed} فایل قدیمی از {folder} حذف شد")
+    return removed
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+        return True
+    except OSError:
+        return False
@@ -0,0 +1,194 @@
+import os
+import queue
+import multiprocessing
+import sqlite3
+import shutil
+import zipfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import pandas as pd
+
+EXCEL_EXTENSIONS = {'xlsx', 'xls'}
+
+# ستون‌هایی که هر شیت داده باید داشته باشد (هر گروه: نام‌های قابل قبول)
+REQUIRED_COLUMNS = (
+    ('نام مشتری', 'نام منشری'),
+    ('شماره تماس',),
+    ('تاریخ ورود',),
+)
+
+
+def excel_row_to_customer(row):
+    """تطبیق نام ستون‌های اکسل با فیلدهای مشتری
+
+    هزینه‌ها خام برگردانده می‌شوند و هنگام نوشتن با safe_int تبدیل می‌شوند.
+    """
+    return {
+        'full_name': str(row.get('نام مشتری', '')) or str(row.get('نام منشری', '')) or 'نامشخص',
+        'phone_number': str(row.get('شماره تماس', '')) or 'نامشخص',
+        'entry_date': str(row.get('تاریخ ورود', '')) or '1403/10/15',
+        'exit_date': str(row.get('تاریخ خروج', '')) or str(row.get('تاریخ حریح', '')) or '',
+        'device_code': str(row.get('کد وسیله', '')) or 'نامشخص',
+        'device_type': str(row.get('نوع وسیله', '')) or 'نامشخص',
+        'material_cost': row.get('قیمت جنس', 0),
+        'service_cost': row.get('سود فروش و دستمزد', 0) or row.get('سود فروش و مستمره', 0),
+        'description': str(row.get('توضیحات', '')) or ''
+    }
+
+
+def is_excel_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in EXCEL_EXTENSIONS
+
+
+def expand_archives(paths, extract_dir):
+    """باز کردن فایل‌های zip و برگرداندن لیست همه فایل‌های اکسل"""
+    workbooks = []
+    for path in paths:
+        # خود xlsx هم zip است، پس پسوند اول بررسی می‌شود
+        if is_excel_file(path):
+            workbooks.append(path)
+        elif zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as archive:
+                for index, member in enumerate(archive.infolist()):
+                    name = os.path.basename(member.filename)
+                    if member.is_dir() or not is_excel_file(name) or name.startswith('~$'):
+                        continue
+                    # فقط نام فایل استفاده می‌شود تا مسیرهای داخل zip بیرون نزنند
+                    target = os.path.join(extract_dir, f"{index}_{name}")
+                    with archive.open(member) as src, open(target, 'wb') as dst:
+                        shutil.copyfileobj(src, dst, 1024 * 1024)
+                    workbooks.append(target)
+    return workbooks
+
+
+def list_sheets(path):
+    """نام همه شیت‌های یک فایل اکسل"""
+    with pd.ExcelFile(path) as workbook:
+        return list(workbook.sheet_names)
+
+
+def parse_sheet(path, sheet_name):
+    """خواندن یک شیت و تبدیل ردیف‌ها به داده مشتری (در پروسس جدا اجرا می‌شود)
+
+    شیت‌هایی که ستون‌های لازم را ندارند (مثل شیت خلاصه) داده مشتری نیستند و
+    None برمی‌گردانند.
+    """
+    df = pd.read_excel(path, sheet_name=sheet_name)
+    columns = set(df.columns)
+    if not all(columns.intersection(names) for names in REQUIRED_COLUMNS):
+        return None
+    return [excel_row_to_customer(row) for row in df.to_dict('records')]
+
+
+def run_import(paths, prepare_row, commit, staging_dir, workers=None,
+               batch_size=500, queue_size=8):
+    """ایمپورت موازی همه شیت‌های همه فایل‌ها، همه یا هیچ
+
+    پارس شیت‌ها در استخر پروسس انجام می‌شود و ردیف‌ها در دسته‌های
+    batch_size از یک صف محدود به رشته نویسنده می‌رسند. نویسنده آن‌ها را با
+    prepare_row(data) به پارامتر تبدیل و در یک دیتابیس موقت در staging_dir
+    جمع می‌کند، پس در طول پارس قفل نوشتن دیتابیس اصلی گرفته نمی‌شود. فقط اگر
+    همه شیت‌ها بدون خطا خوانده شوند، commit(rows) با یک iterator روی همه
+    ردیف‌ها صدا زده می‌شود تا آن‌ها را در یک تراکنش ثبت کند.
+
+    شیت‌های بدون ستون‌های لازم با skipped علامت می‌خورند و خطا حساب نمی‌شوند.
+    خروجی شامل تعداد ثبت شده، نتیجه هر شیت و committed است؛ اگر committed
+    False باشد هیچ ردیفی ثبت نشده است.
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks = []
+    sheets = []
+    for path in paths:
+        try:
+            for sheet_name in list_sheets(path):
+                tasks.append((path, sheet_name))
+        except Exception as e:
+            sheets.append({'file': os.path.basename(path), 'sheet': None,
+                           'rows': 0, 'skipped': False, 'error': str(e)})
+
+    staging = sqlite3.connect(os.path.join(staging_dir, 'staging.db'), check_same_thread=False)
+    batches = queue.Queue(maxsize=queue_size)
+    state = {'staged': 0, 'error': None}
+
+    def writer():
+        while True:
+            batch = batches.get()
+            if batch is None:
+                break
+            if state['error'] is not None:
+                continue
+            try:
+                params = [prepare_row(data) for data in batch]
+                if not state['staged']:
+                    columns = ', '.join(f'c{index}' for index in range(len(params[0])))
+                    staging.execute(f'CREATE TABLE rows ({columns})')
+                placeholders = ', '.join('?' * len(params[0]))
+                staging.executemany(f'INSERT INTO rows VALUES ({placeholders})', params)
+                staging.commit()
+                state['staged'] += len(params)
+            except Exception as e:
+                state['error'] = e
+
+    writer_thread = threading.Thread(target=writer, name='import-writer', daemon=True)
+    writer_thread.start()
+
+    def handle(task, rows=None, error=None):
+        path, sheet_name = task
+        sheets.append({'file': os.path.basename(path), 'sheet': sheet_name,
+                       'rows': len(rows or []), 'skipped': rows is None and error is None,
+                       'error': str(error) if error else None})
+        for start in range(0, len(rows or []), batch_size):
+            # صف محدود: اگر نویسنده عقب بماند، پارس‌های جدید صبر می‌کنند
+            batches.put(rows[start:start + batch_size])
+
+    try:
+        try:
+            if workers == 1 or len(tasks) <= 1:
+                for task in tasks:
+                    try:
+                        rows = parse_sheet(*task)
+                    except Exception as e:
+                        handle(task, error=e)
+                    else:
+                        handle(task, rows)
+            else:
+                # spawn به جای fork: پروسس اصلی رشته‌های نویسنده و زمان‌بند دارد
+                # و fork با رشته‌های فعال ممکن است قفل‌ها را در حالت گرفته کپی کند
+                spawn = multiprocessing.get_context('spawn')
+                with ProcessPoolExecutor(max_workers=workers, mp_context=spawn) as pool:
+                    max_in_flight = workers * 2
+                    pending = {}
+                    remaining = iter(tasks)
+                    while True:
+                        while len(pending) < max_in_flight:
+                            task = next(remaining, None)
+                            if task is None:
+                                break
+                            pending[pool.submit(parse_sheet, *task)] = task
+                        if not pending:
+                            break
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            task = pending.pop(future)
+                            try:
+                                rows = future.result()
+                            except Exception as e:
+                                handle(task, error=e)
+                            else:
+                                handle(task, rows)
+        finally:
+            batches.put(None)
+            writer_thread.join()
+
+        if state['error'] is not None:
+            raise state['error']
+
+        failed = any(sheet['error'] for sheet in sheets)
+        imported = 0
+        if not failed and state['staged']:
+            imported = commit(staging.execute('SELECT * FROM rows ORDER BY rowid'))
+    finally:
+        staging.close()
+
+    return {'imported': imported, 'sheets': sheets, 'committed': not failed}
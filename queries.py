@@ -0,0 +1,94 @@
+"""کوئری‌های فقط‌خواندنی مشترک بین نماهای Flask و لایه async"""
+
+CUSTOMER_COLUMNS = (
+    'id', 'full_name', 'phone_number', 'entry_date', 'exit_date', 'device_code',
+    'device_type', 'material_cost', 'service_cost', 'total_cost', 'description', 'created_at'
+)
+
+
+def customer_to_dict(customer):
+    """تبدیل ردیف کامل مشتری به دیکشنری"""
+    return dict(zip(CUSTOMER_COLUMNS, customer))
+
+
+def fetch_stats(conn):
+    """آمار کلی: تعداد مشتریان، مجموع و میانگین درآمد"""
+    cursor = conn.cursor()
+
+    # تعداد کل مشتریان
+    cursor.execute('SELECT COUNT(*) FROM customers')
+    total_customers = cursor.fetchone()[0]
+
+    # مجموع درآمد
+    cursor.execute('SELECT SUM(total_cost) FROM customers WHERE total_cost IS NOT NULL')
+    total_income_result = cursor.fetchone()[0]
+    total_income = total_income_result if total_income_result is not None else 0
+
+    # میانگین درآمد
+    cursor.execute('SELECT AVG(total_cost) FROM customers WHERE total_cost IS NOT NULL AND total_cost > 0')
+    average_income_result = cursor.fetchone()[0]
+    average_income = int(average_income_result) if average_income_result is not None else 0
+
+    return {
+        'total_customers': total_customers,
+        'total_income': total_income,
+        'average_income': average_income
+    }
+
+
+def fetch_recent_customers(conn, limit=5):
+    """آخرین مشتریان برای داشبورد"""
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT id, full_name, phone_number, device_type, entry_date, total_cost
+        FROM customers
+        ORDER BY created_at DESC
+        LIMIT ?
+    ''', (limit,))
+
+    result = []
+    for customer in cursor.fetchall():
+        result.append({
+            'id': customer[0],
+            'full_name': customer[1],
+            'phone_number': customer[2],
+            'device_type': customer[3],
+            'entry_date': customer[4],
+            'total_cost': customer[5] or 0
+        })
+    return result
+
+
+def fetch_customer(conn, customer_id):
+    """اطلاعات کامل یک مشتری یا None"""
+    cursor = conn.cursor()
+    cursor.execute('SELECT * FROM customers WHERE id = ?', (customer_id,))
+    customer = cursor.fetchone()
+    return customer_to_dict(customer) if customer else None
+
+
+def search_customer_rows(conn, query, limit=None, offset=0):
+    """جستجوی مشتریان در نام، تلفن، کد و نوع وسیله"""
+    sql = '''
+        SELECT * FROM customers
+        WHERE full_name LIKE ? OR phone_number LIKE ? OR device_code LIKE ? OR device_type LIKE ?
+        ORDER BY created_at DESC
+    '''
+    params = (f'%{query}%', f'%{query}%', f'%{query}%', f'%{query}%')
+    if limit is not None:
+        sql += ' LIMIT ? OFFSET ?'
+        params += (limit, offset)
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    return cursor.fetchall()
+
+
+def fetch_customer_page(conn, before_id=None, limit=500):
+    """یک صفحه از مشتریان به ترتیب نزولی شناسه (صفحه‌بندی keyset)"""
+    cursor = conn.cursor()
+    if before_id is None:
+        cursor.execute('SELECT * FROM customers ORDER BY id DESC LIMIT ?', (limit,))
+    else:
+        cursor.execute('SELECT * FROM customers WHERE id < ? ORDER BY id DESC LIMIT ?',
+                       (before_id, limit))
+    return cursor.fetchall()
@@ -0,0 +1,97 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import request, make_response
+
+# پاسخ‌های کوچک‌تر از این مقدار فشرده نمی‌شوند
+MIN_COMPRESS_SIZE = 1024
+
+
+class CachedPage:
+    """خروجی رندر شده یک صفحه به همراه نسخه فشرده و ETag"""
+
+    __slots__ = ('body', 'gzipped', 'etag')
+
+    def __init__(self, body, etag):
+        self.body = body
+        self.etag = etag
+        self.gzipped = gzip.compress(body, compresslevel=6) if len(body) >= MIN_COMPRESS_SIZE else None
+
+
+class PageCache:
+    """کش LRU صفحات رندر شده بر اساس نسخه داده و پارامترهای درخواست
+
+    فقط صفحات آخرین نسخه داده نگه داشته می‌شوند؛ با دیدن نسخه جدید همه
+    ورودی‌های قبلی دور ریخته می‌شوند.
+    """
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _check_version(self, version):
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def get(self, version, key):
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, version, key, entry):
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def make_etag(key):
+    return hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:32]
+
+
+def cached_page_response(cache, version, key, render, mimetype='text/html'):
+    """پاسخ صفحه از کش، با پشتیبانی از 304 و gzip
+
+    version نسخه فعلی داده است و key پارامترهای صفحه؛ render() فقط وقتی صدا
+    زده می‌شود که صفحه در کش نباشد. ETag ضعیف است چون نسخه فشرده و ساده
+    یک صفحه بایت‌به‌بایت یکسان نیستند.
+    """
+    etag = make_etag((version, key))
+
+    # مرورگر همین نسخه را دارد؛ نه کوئری، نه رندر
+    if request.if_none_match.contains_weak(etag):
+        response = make_response('', 304)
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'no-cache'
+        response.vary.add('Accept-Encoding')
+        return response
+
+    entry = cache.get(version, key)
+    if entry is None:
+        entry = CachedPage(render().encode('utf-8'), etag)
+        cache.put(version, key, entry)
+
+    if entry.gzipped is not None and request.accept_encodings['gzip']:
+        response = make_response(entry.gzipped)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = make_response(entry.body)
+    response.mimetype = mimetype
+    response.set_etag(entry.etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+    return response
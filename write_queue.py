@@ -0,0 +1,164 @@
+import sqlite3
+import threading
+import queue
+
+
+class WriteRequest:
+    """یک درخواست نوشتن که منتظر نتیجه از رشته نویسنده است"""
+
+    __slots__ = ('func', 'done', 'result', 'error', 'state', 'lock')
+
+    def __init__(self, func):
+        self.func = func
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        # queued → running یا queued → cancelled
+        self.state = 'queued'
+        self.lock = threading.Lock()
+
+    def claim(self):
+        """شروع اجرا توسط نویسنده؛ False اگر فراخوان قبلاً لغو کرده باشد"""
+        with self.lock:
+            if self.state != 'queued':
+                return False
+            self.state = 'running'
+            return True
+
+    def cancel(self):
+        """لغو درخواستی که هنوز اجرا نشده؛ False اگر اجرا شروع شده باشد"""
+        with self.lock:
+            if self.state != 'queued':
+                return False
+            self.state = 'cancelled'
+            return True
+
+
+class WriteQueue:
+    """صف نوشتن تک‌نویسنده با کامیت گروهی
+
+    همه نوشتن‌ها از طریق یک رشته و یک اتصال انجام می‌شوند، پس قفل نوشتن
+    SQLite هیچ‌وقت بین اتصال‌ها دست‌به‌دست نمی‌شود. درخواست‌هایی که هم‌زمان
+    برسند در یک تراکنش کامیت می‌شوند و هر درخواست savepoint خودش را دارد تا
+    خطای یکی بقیه را خراب نکند.
+    """
+
+    def __init__(self, db_path, max_batch=64, max_wait=0.005):
+        self.db_path = db_path
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """راه‌اندازی رشته نویسنده (در صورت نیاز)"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='sqlite-writer', daemon=True
+                )
+                self._thread.start()
+
+    def stop(self, timeout=5):
+        """توقف رشته نویسنده بعد از خالی شدن صف"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def submit(self, func, timeout=30):
+        """اجرای func(cursor) روی رشته نویسنده و برگرداندن نتیجه آن
+
+        func داخل تراکنش گروهی اجرا می‌شود و نباید commit یا rollback کند.
+        خطای func در همین رشته فراخوان دوباره raise می‌شود.
+
+        اگر تا timeout ثانیه اجرای درخواست شروع نشود، لغو می‌شود و هرگز
+        نوشته نخواهد شد، پس تکرار آن امن است. اگر اجرا شروع شده باشد تا پایان
+        کامیت صبر می‌شود تا نتیجه واقعی گزارش شود.
+        """
+        self.start()
+        item = WriteRequest(func)
+        self._queue.put(item)
+        if not item.done.wait(timeout):
+            if item.cancel():
+                raise TimeoutError('زمان انتظار برای نوشتن در دیتابیس تمام شد')
+            item.done.wait()
+        if item.error is not None:
+            raise item.error
+        return item.result
+
+    def execute(self, sql, params=()):
+        """اجرای یک دستور نوشتن و برگرداندن (lastrowid, rowcount)"""
+        def _execute(cursor):
+            cursor.execute(sql, params)
+            return cursor.lastrowid, cursor.rowcount
+        return self.submit(_execute)
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.db_path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _collect(self, first):
+        """جمع کردن درخواست‌هایی که تا چند میلی‌ثانیه بعد می‌رسند"""
+        batch = [first]
+        stop = False
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get(timeout=self.max_wait)
+            except queue.Empty:
+                break
+            if item is None:
+                stop = True
+                break
+            batch.append(item)
+        return batch, stop
+
+    def _run(self):
+        conn = self._connect()
+        cursor = conn.cursor()
+        try:
+            while True:
+                first = self._queue.get()
+                if first is None:
+                    break
+                batch, stop = self._collect(first)
+                self._commit_batch(conn, cursor, batch)
+                if stop:
+                    break
+        finally:
+            conn.close()
+
+    def _commit_batch(self, conn, cursor, batch):
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            for item in batch:
+                # درخواست‌هایی که فراخوانشان منتظر نمانده اجرا نمی‌شوند
+                if not item.claim():
+                    continue
+                cursor.execute('SAVEPOINT write_request')
+                try:
+                    item.result = item.func(cursor)
+                    cursor.execute('RELEASE write_request')
+                except Exception as e:
+                    item.error = e
+                    cursor.execute('ROLLBACK TO write_request')
+                    cursor.execute('RELEASE write_request')
+            cursor.execute('COMMIT')
+        except Exception as e:
+            print(f"❌ خطا در کامیت گروهی: {e}")
+            if conn.in_transaction:
+                conn.rollback()
+            for item in batch:
+                if item.error is None:
+                    item.result = None
+                    item.error = e
+        finally:
+            for item in batch:
+                item.done.set()